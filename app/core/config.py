@@ -1,7 +1,11 @@
 import json
+import logging
 import os
+import threading
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
 
 CONFIG_PATH = "/config/settings.json"
 
@@ -13,6 +17,11 @@ class SonarrSettings(BaseModel):
     url: str = ""
     api_key: str = ""
 
+class HttpSettings(BaseModel):
+    pool_size: int = 10
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+
 class SchedulerSettings(BaseModel):
     enabled: bool = True
     cron_expression: str = "0 */6 * * *"
@@ -34,26 +43,117 @@ class ExclusionSettings(BaseModel):
     radarr_mapping: ServicePathMapping = ServicePathMapping(from_prefix="/data/", to_prefix="/mnt/chloe/data/")
     sonarr_mapping: ServicePathMapping = ServicePathMapping(from_prefix="/data/", to_prefix="/mnt/chloe/data/")
     plexcache_mapping: ServicePathMapping = ServicePathMapping(from_prefix="/chloe/", to_prefix="/mnt/chloe/data/media/")
+    radarr_extra_mappings: List[ServicePathMapping] = []
+    sonarr_extra_mappings: List[ServicePathMapping] = []
+    plexcache_extra_mappings: List[ServicePathMapping] = []
     last_build: Optional[str] = None
     full_sync_cron: str = "0 * * * *"
     log_monitor_cron: str = "*/5 * * * *"
     last_stats_update: Optional[str] = None
+    sonarr_fetch_workers: int = 4
+    sonarr_request_timeout: int = 60
+    build_timeout: int = 900
+    episode_cache_enabled: bool = True
+    episode_cache_max_age: int = 86400
+    existence_check_workers: int = 8
+    library_cache_ttl: int = 300
+    library_cache_stale_ttl: int = 3600
+    mover_log_retention_days: int = 0
+    mover_log_retention_action: str = "compress"
+    webhook_token: str = ""
+    sonarr_collapse_folders: bool = False
+    plexcache_collapse_folders: bool = False
+    collapse_min_files: int = 2
+    cache_budget_enabled: bool = False
+    cache_max_fill_percent: float = 90.0
+    cache_reserved_gb: float = 0
+    radarr_tag_priorities: Dict[int, int] = {}
+    sonarr_tag_priorities: Dict[int, int] = {}
+    plexcache_priority: int = 0
 
 class UserSettings(BaseModel):
     radarr: RadarrSettings = RadarrSettings()
     sonarr: SonarrSettings = SonarrSettings()
     exclusions: ExclusionSettings = ExclusionSettings()
     scheduler: SchedulerSettings = SchedulerSettings()
+    http: HttpSettings = HttpSettings()
 
-def get_user_settings() -> UserSettings:
-    if os.path.exists(CONFIG_PATH):
+class SettingsStore:
+    """Process-wide settings cache, reloaded only when settings.json changes on disk.
+
+    Every caller gets its own deep copy, so a route editing its settings
+    never changes what a running build sees, and an edit only becomes
+    visible to others once save() has written it to disk. Read-modify-write
+    changes go through update() so concurrent edits don't overwrite each other.
+    """
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self._settings: Optional[UserSettings] = None
+        self._stamp = None
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def get(self) -> UserSettings:
+        stamp = self._file_stamp()
+        settings = self._settings
+        if settings is not None and stamp == self._stamp:
+            return settings.model_copy(deep=True)
+        with self.lock:
+            stamp = self._file_stamp()
+            if self._settings is None or stamp != self._stamp:
+                self._settings = self._load(stamp)
+                self._stamp = stamp
+            return self._settings.model_copy(deep=True)
+
+    def _load(self, stamp) -> UserSettings:
+        if stamp is None:
+            return UserSettings()
         try:
-            with open(CONFIG_PATH, "r") as f:
+            with open(self.path, "r") as f:
                 return UserSettings.parse_obj(json.load(f))
-        except: return UserSettings()
-    return UserSettings()
+        except Exception as e:
+            logger.error(f"Failed to load settings, using defaults: {e}")
+            return UserSettings()
+
+    def save(self, settings: UserSettings):
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            # Write to a temp file and rename so readers never see a half-written file
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(settings.dict(), f, indent=4)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            # The caller keeps its instance, so the cached one must not be shared with it
+            self._settings = settings.model_copy(deep=True)
+            self._stamp = self._file_stamp()
+
+    def update(self, fn: Callable[[UserSettings], None]) -> UserSettings:
+        """Apply fn to a fresh copy and save it, all under the lock; on failure nothing changes"""
+        with self.lock:
+            settings = self.get()
+            fn(settings)
+            self.save(settings)
+            return settings
+
+_settings_store = SettingsStore()
+
+def get_user_settings() -> UserSettings:
+    return _settings_store.get()
 
 def save_user_settings(settings: UserSettings):
-    os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
-    with open(CONFIG_PATH, "w") as f:
-        json.dump(settings.dict(), f, indent=4)
+    _settings_store.save(settings)
+
+def update_user_settings(fn: Callable[[UserSettings], None]) -> UserSettings:
+    return _settings_store.update(fn)
@@ -1,47 +1,60 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from app.core.config import get_user_settings, save_user_settings
+from apscheduler.triggers.interval import IntervalTrigger
+from app.core.config import get_user_settings, update_user_settings
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 def run_sync_task():
-    from app.services.exclusions import get_exclusion_manager
-    get_exclusion_manager().build_exclusions()
-    
-    # Save timestamp
-    settings = get_user_settings()
-    settings.exclusions.last_build = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    save_user_settings(settings)
-    logger.info(f"Cron Task: Builder complete at {settings.exclusions.last_build}")
+    from app.services.build_jobs import get_build_runner
+    # Goes through the same single-flight runner as manual builds, so the two never overlap
+    job = get_build_runner().submit("scheduled")
+    job.done.wait()
+    if job.status != "succeeded":
+        logger.warning(f"Cron Task: Build {job.id} {job.status}")
+        return
+    # build_exclusions stamps last_build itself
+    result = job.result or {}
+    logger.info(f"Cron Task: Build {job.id} complete in {job.to_dict()['elapsed']}s: {result.get('total', 0)} paths, "
+                f"+{result.get('added', 0)} / -{result.get('removed', 0)}")
 
 def run_stats_task():
     from app.services.ca_mover import get_mover_parser
     parser = get_mover_parser()
-    parser.get_latest_stats()
+    parser.refresh_index()
     
     # Save timestamp
-    settings = get_user_settings()
-    settings.exclusions.last_stats_update = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    save_user_settings(settings)
+    def stamp(settings):
+        settings.exclusions.last_stats_update = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    settings = update_user_settings(stamp)
     logger.info(f"Cron Task: Stats refresh complete at {settings.exclusions.last_stats_update}")
 
+def run_library_refresh_task():
+    from app.services.library_cache import get_library_cache
+    get_library_cache().refresh_all()
+
 class CacheScheduler:
     def __init__(self):
         self.scheduler = BackgroundScheduler()
         self.sync_id = "full_sync"
         self.monitor_id = "log_monitor"
+        self.library_id = "library_refresh"
 
     def start(self):
         settings = get_user_settings()
         self.scheduler.add_job(run_sync_task, CronTrigger.from_crontab(settings.exclusions.full_sync_cron), id=self.sync_id)
-        self.scheduler.add_job(run_stats_task, CronTrigger.from_crontab(settings.exclusions.log_monitor_cron), id=self.monitor_id)
+        # Also index the mover logs once at startup so the first page views have data
+        self.scheduler.add_job(run_stats_task, CronTrigger.from_crontab(settings.exclusions.log_monitor_cron), id=self.monitor_id,
+                               next_run_time=datetime.now())
+        self.scheduler.add_job(run_library_refresh_task, IntervalTrigger(seconds=max(60, settings.exclusions.library_cache_ttl)), id=self.library_id)
         self.scheduler.start()
 
     def reload_jobs(self):
         settings = get_user_settings()
         self.scheduler.reschedule_job(self.sync_id, trigger=CronTrigger.from_crontab(settings.exclusions.full_sync_cron))
         self.scheduler.reschedule_job(self.monitor_id, trigger=CronTrigger.from_crontab(settings.exclusions.log_monitor_cron))
+        self.scheduler.reschedule_job(self.library_id, trigger=IntervalTrigger(seconds=max(60, settings.exclusions.library_cache_ttl)))
 
 scheduler_service = CacheScheduler()
@@ -1,8 +1,10 @@
 import logging
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from app.routers import dashboard, movies, shows, exclusions, settings, logs, stats, operations
+from app.routers import dashboard, movies, shows, exclusions, settings, logs, stats, operations, metrics, webhooks
 from app.core.scheduler import scheduler_service
+from app.services.radarr import close_async_radarr_client
+from app.services.sonarr import close_async_sonarr_client
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,6 +26,8 @@ app.include_router(settings.router, prefix="/settings", tags=["Settings"])
 app.include_router(logs.router, prefix="/logs", tags=["Logs"])
 app.include_router(stats.router, prefix="/stats", tags=["Stats"])
 app.include_router(operations.router, prefix="/operations", tags=["Operations"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+app.include_router(webhooks.router, prefix="/webhooks", tags=["Webhooks"])
 
 @app.get("/")
 async def root():
@@ -34,3 +38,8 @@ async def root():
 async def startup_event():
     scheduler_service.start()
     logger.info("Mover Tuning Exclusion Manager started and scheduler initialized.")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_async_radarr_client()
+    await close_async_sonarr_client()
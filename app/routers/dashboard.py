@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from app.services.ca_mover import get_mover_parser
-from app.services.radarr import get_radarr_client
-from app.services.sonarr import get_sonarr_client
+from app.services.radarr import get_async_radarr_client
+from app.services.sonarr import get_async_sonarr_client
 from app.services.stats_cache import get_stats_cache
+from app.services.dashboard_sources import Source, get_last_known_good
 import datetime
 import os
 
@@ -12,43 +14,49 @@ router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
 
+def _last_build():
+    exclusions_file = "/config/mover_exclusions.txt"
+    if os.path.exists(exclusions_file):
+        return os.path.getmtime(exclusions_file)
+    return None
+
+# Service pings get a short deadline; local sources should answer almost immediately
+SOURCES = {
+    "radarr_up": Source(lambda: get_async_radarr_client().test_connection(), deadline=2.0, default=False),
+    "sonarr_up": Source(lambda: get_async_sonarr_client().test_connection(), deadline=2.0, default=False),
+    "counts": Source(lambda: run_in_threadpool(get_stats_cache().get_counts), deadline=1.0,
+                     default={"movie_count": 0, "tv_count": 0, "total_count": 0}),
+    "mover_stats": Source(lambda: run_in_threadpool(get_mover_parser().get_latest_stats, include_files=False), deadline=1.0),
+    "last_build": Source(lambda: run_in_threadpool(_last_build), deadline=1.0),
+}
+
+
 @router.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request):
-    mover = get_mover_parser()
-    
-    # Test connections (fast - just pings the API)
-    radarr_connected = get_radarr_client().test_connection()
-    sonarr_connected = get_sonarr_client().test_connection()
-    
-    # Get counts from cache (reads from exclusion file)
-    cache = get_stats_cache()
-    cache.refresh_from_file()  # Quick file read
-    counts = cache.get_counts()
-    
-    # Get CA Mover stats
-    mover_stats = mover.get_latest_stats()
-    
+    # All sources run at once; a slow one shows its last known value instead of holding up the page
+    results = await get_last_known_good().gather(SOURCES)
+    counts = results["counts"].value
+    mover_stats = results["mover_stats"].value
+
     ca_mover_status = "No logs found"
     last_mover_run = "N/A"
     if mover_stats:
         ca_mover_status = f"{mover_stats['excluded']} Excluded / {mover_stats['moved']} Moved"
         last_mover_run = datetime.datetime.fromtimestamp(mover_stats['timestamp']).strftime('%Y-%m-%d %H:%M')
-    
-    # Get last build time from file
+
     last_build = "Never"
-    exclusions_file = "/config/mover_exclusions.txt"
-    if os.path.exists(exclusions_file):
-        mtime = os.path.getmtime(exclusions_file)
-        last_build = datetime.datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M')
-    
+    if results["last_build"].value:
+        last_build = datetime.datetime.fromtimestamp(results["last_build"].value).strftime('%Y-%m-%d %H:%M')
+
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
-        "radarr_up": radarr_connected,
-        "sonarr_up": sonarr_connected,
+        "radarr_up": results["radarr_up"].value,
+        "sonarr_up": results["sonarr_up"].value,
         "movie_count": counts['movie_count'],
         "tv_count": counts['tv_count'],
         "exclusion_count": counts['total_count'],
         "ca_mover_status": ca_mover_status,
         "last_mover_run": last_mover_run,
-        "last_build": last_build
+        "last_build": last_build,
+        "sources": results
     })
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Request, Form
+from fastapi import APIRouter, Request, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from app.core.config import get_user_settings, save_user_settings
-from app.services.radarr import get_radarr_client
-from app.services.sonarr import get_sonarr_client
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import get_user_settings, update_user_settings
+from app.services.library_cache import get_library_cache
+from app.services.media import TagTable
 from app.services.exclusions import get_exclusion_manager
+from app.services.cache_budget import get_cache_budget
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,73 +17,83 @@ templates = Jinja2Templates(directory="app/templates")
 @router.get("/", response_class=HTMLResponse)
 async def exclusions_page(request: Request):
     user_settings = get_user_settings()
-    radarr_client = get_radarr_client()
-    sonarr_client = get_sonarr_client()
+    library = get_library_cache()
     
-    tags, sonarr_tags = [], []
-    try:
-        tags = radarr_client.get_all_tags()
-    except Exception: pass
-    try:
-        sonarr_tags = sonarr_client.get_all_tags()
-    except Exception: pass
+    # Tag tables are empty when a service is unreachable
+    radarr_tag_table, sonarr_tag_table = [
+        TagTable([]) if isinstance(t, Exception) else t
+        for t in await asyncio.gather(library.aget("radarr_tags"), library.aget("sonarr_tags"), return_exceptions=True)
+    ]
+    tags, sonarr_tags = radarr_tag_table.tags, sonarr_tag_table.tags
     
     excl_manager = get_exclusion_manager()
-    stats = excl_manager.get_exclusion_stats()
-    exclusions = excl_manager.get_all_exclusions()
+    # Indexing a changed file can take a moment on large libraries, so keep it off the event loop
+    stats = await run_in_threadpool(excl_manager.get_exclusion_stats)
+    budget = get_cache_budget().last_report() if user_settings.exclusions.cache_budget_enabled else None
     
+    # The file itself is paged in by the browser from /exclusions/api
     return templates.TemplateResponse("exclusions.html", {
         "request": request,
         "user_settings": user_settings,
         "tags": tags,
         "sonarr_tags": sonarr_tags,
         "stats": stats,
-        "exclusions": exclusions
+        "budget": budget
     })
 
+@router.get("/api")
+async def exclusions_api(
+    q: str = "",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+):
+    """One page of the exclusion file; q is a path prefix if it starts with '/', otherwise words to match"""
+    return await run_in_threadpool(get_exclusion_manager().search_exclusions, q, offset, limit)
+
+@router.get("/api/budget")
+async def budget_api():
+    """Budget, kept and dropped bytes and the dropped titles of the last budgeted build"""
+    return await run_in_threadpool(get_cache_budget().last_report) or {}
+
+def _add_tag(tag_ids, tag_id):
+    if tag_id not in tag_ids:
+        tag_ids.append(tag_id)
+
+def _remove_tag(tag_ids, tag_id):
+    if tag_id in tag_ids:
+        tag_ids.remove(tag_id)
+
 @router.post("/radarr-tags/add")
 async def add_radarr_tag(tag_id: int = Form(...)):
-    user_settings = get_user_settings()
-    if tag_id not in user_settings.exclusions.radarr_exclude_tag_ids:
-        user_settings.exclusions.radarr_exclude_tag_ids.append(tag_id)
-        save_user_settings(user_settings)
+    update_user_settings(lambda s: _add_tag(s.exclusions.radarr_exclude_tag_ids, tag_id))
     return RedirectResponse(url="/exclusions/", status_code=303)
 
 @router.post("/radarr-tags/remove")
 async def remove_radarr_tag(tag_id: int = Form(...)):
-    user_settings = get_user_settings()
-    if tag_id in user_settings.exclusions.radarr_exclude_tag_ids:
-        user_settings.exclusions.radarr_exclude_tag_ids.remove(tag_id)
-        save_user_settings(user_settings)
+    update_user_settings(lambda s: _remove_tag(s.exclusions.radarr_exclude_tag_ids, tag_id))
     return RedirectResponse(url="/exclusions/", status_code=303)
 
 @router.post("/sonarr-tags/add")
 async def add_sonarr_tag(tag_id: int = Form(...)):
-    user_settings = get_user_settings()
-    if tag_id not in user_settings.exclusions.sonarr_exclude_tag_ids:
-        user_settings.exclusions.sonarr_exclude_tag_ids.append(tag_id)
-        save_user_settings(user_settings)
+    update_user_settings(lambda s: _add_tag(s.exclusions.sonarr_exclude_tag_ids, tag_id))
     return RedirectResponse(url="/exclusions/", status_code=303)
 
 @router.post("/sonarr-tags/remove")
 async def remove_sonarr_tag(tag_id: int = Form(...)):
-    user_settings = get_user_settings()
-    if tag_id in user_settings.exclusions.sonarr_exclude_tag_ids:
-        user_settings.exclusions.sonarr_exclude_tag_ids.remove(tag_id)
-        save_user_settings(user_settings)
+    update_user_settings(lambda s: _remove_tag(s.exclusions.sonarr_exclude_tag_ids, tag_id))
     return RedirectResponse(url="/exclusions/", status_code=303)
 
 @router.post("/plexcache")
 async def save_plexcache(plexcache_file_path: str = Form(...)):
-    user_settings = get_user_settings()
-    user_settings.exclusions.plexcache_file_path = plexcache_file_path
-    save_user_settings(user_settings)
+    def apply(settings):
+        settings.exclusions.plexcache_file_path = plexcache_file_path
+    update_user_settings(apply)
     return RedirectResponse(url="/exclusions/?success=true", status_code=303)
 
 @router.post("/custom-folders")
 async def save_custom_folders(custom_folders: str = Form("")):
     folder_list = [f.strip() for f in custom_folders.split('\n') if f.strip()]
-    user_settings = get_user_settings()
-    user_settings.exclusions.custom_folders = folder_list
-    save_user_settings(user_settings)
+    def apply(settings):
+        settings.exclusions.custom_folders = folder_list
+    update_user_settings(apply)
     return RedirectResponse(url="/exclusions/?success=true", status_code=303)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import get_registry
+
+router = APIRouter()
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("", response_class=PlainTextResponse)
+async def metrics():
+    """Builder stage timings, mover log parsing and Radarr/Sonarr client metrics"""
+    return PlainTextResponse(get_registry().render(), media_type=CONTENT_TYPE)
@@ -1,52 +1,66 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from typing import List
+import asyncio
 import logging
 
-from app.services.radarr import get_radarr_client
+from app.services.library_cache import get_library_cache
+from app.services.library_index import get_library_index
+from app.services.media import TagTable
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
 
-@router.get("/", response_class=HTMLResponse)
-async def movies_page(request: Request):
-    """Movies listing page - shows all movies from Radarr"""
-    radarr_client = get_radarr_client()
-    
-    movies = []
-    
+async def _movie_index():
+    library = get_library_cache()
+    movies, tag_table = [], TagTable([])
     try:
-        # Get all movies and tags from Radarr
-        all_movies = radarr_client.get_all_movies()
-        all_tags = radarr_client.get_all_tags()
-        
-        # Create tag ID to label mapping
-        tag_map = {tag['id']: tag['label'] for tag in all_tags}
-        
-        for movie in all_movies:
-            # Map tag IDs to tag labels
-            tag_ids = movie.get('tags', [])
-            tag_labels = [tag_map.get(tag_id, f"Unknown Tag {tag_id}") for tag_id in tag_ids]
-            
-            movies.append({
-                'id': movie['id'],
-                'title': movie['title'],
-                'year': movie.get('year', 'N/A'),
-                'tags': tag_labels
-            })
+        # Movie records and tag table from the shared library cache
+        movies, tag_table = await asyncio.gather(library.aget("radarr_movies"), library.aget("radarr_tags"))
     except Exception as e:
         logger.error(f"Failed to fetch movies: {e}")
-    
-    # Collect all unique tags across all movies for filter UI
-    all_tag_labels = sorted(set(tag for m in movies for tag in m['tags']))
+    # Rebuilding after a library change sorts and tokenizes every title, so keep it off the event loop
+    return await run_in_threadpool(get_library_index, "radarr", movies, tag_table)
+
+
+@router.get("/", response_class=HTMLResponse)
+async def movies_page(request: Request):
+    """Movies listing page - rows are loaded page by page from /movies/api"""
+    index = await _movie_index()
 
     context = {
         "request": request,
-        "movies": movies,
-        "total": len(movies),
-        "all_tags": all_tag_labels
+        "total": len(index.records),
+        "all_tags": index.tags()
     }
     
     return templates.TemplateResponse("movies.html", context)
+
+
+@router.get("/api")
+async def movies_api(
+    q: str = "",
+    tag: List[int] = Query([]),
+    untagged: bool = False,
+    sort: str = Query("title", pattern="^(title|year)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+):
+    """One page of movies, filtered by title words and tag IDs (all must match)"""
+    index = await _movie_index()
+    total, page = index.search(q, tag, untagged, sort, order == "desc", offset, limit)
+    labels_for = index.tag_table.labels_for
+    return {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "items": [
+            {"id": m.id, "title": m.title, "year": m.year, "tags": labels_for(m.tags)}
+            for m in page
+        ],
+    }
@@ -1,27 +1,49 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import RedirectResponse
-from app.services.exclusions import get_exclusion_manager
+from app.services.build_jobs import get_build_runner
 
 router = APIRouter()
 
 
 @router.post("/run/exclusions")
 async def trigger_exclusion_build():
-    """Manually trigger exclusion builder"""
-    try:
-        excl = get_exclusion_manager()
-        excl.build_exclusions()
-        return RedirectResponse(url="/?success=exclusions_built", status_code=303)
-    except Exception as e:
-        return RedirectResponse(url="/?error=build_failed", status_code=303)
+    """Manually trigger exclusion builder; the build runs in the background"""
+    job = get_build_runner().submit("manual")
+    return RedirectResponse(url=f"/dashboard/?job={job.id}", status_code=303)
 
 
 @router.post("/run/all")
 async def trigger_full_sync():
-    """Manually trigger full sync"""
-    try:
-        excl = get_exclusion_manager()
-        excl.build_exclusions()
-        return RedirectResponse(url="/?success=sync_complete", status_code=303)
-    except Exception as e:
-        return RedirectResponse(url="/?error=sync_failed", status_code=303)
+    """Manually trigger full sync; the build runs in the background"""
+    job = get_build_runner().submit("full_sync")
+    return RedirectResponse(url=f"/dashboard/?job={job.id}", status_code=303)
+
+
+@router.get("/jobs")
+async def list_jobs():
+    """Running, queued and recently finished builds"""
+    return get_build_runner().status()
+
+
+@router.post("/jobs")
+async def submit_job():
+    """Start a build, or join the one already queued"""
+    return get_build_runner().submit("manual").to_dict()
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status, phase, items processed and elapsed time of a build"""
+    job = get_build_runner().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued build, or stop a running one at its next phase checkpoint"""
+    job = get_build_runner().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
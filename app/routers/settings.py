@@ -2,13 +2,26 @@ from app.core.scheduler import scheduler_service
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from app.core.config import get_user_settings, save_user_settings
+from app.core.config import get_user_settings, update_user_settings
+from app.services.library_cache import get_library_cache
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
+def _parse_extra_mappings(text: str):
+    """Parse 'from => to' lines from the additional mappings textarea"""
+    from app.core.config import ServicePathMapping
+    mappings = []
+    for line in (text or "").splitlines():
+        if "=>" not in line:
+            continue
+        from_prefix, to_prefix = (part.strip() for part in line.split("=>", 1))
+        if from_prefix:
+            mappings.append(ServicePathMapping(from_prefix=from_prefix, to_prefix=to_prefix))
+    return mappings
+
 @router.get("", response_class=HTMLResponse)
 async def settings_page(request: Request):
     settings = get_user_settings()
@@ -22,73 +35,77 @@ async def save_paths(
     tv_base_path: str = Form(...),
     ca_mover_log_path: str = Form(...),
     full_sync_cron: str = Form(...),
-    log_monitor_cron: str = Form(...)
+    log_monitor_cron: str = Form(...),
+    mover_log_retention_days: int = Form(0),
+    mover_log_retention_action: str = Form("compress")
 ):
     from app.core.config import ServicePathMapping
-    settings = get_user_settings()
-    settings.exclusions.cache_mount_path = cache_mount_path
-    settings.exclusions.movie_base_path = movie_base_path
-    settings.exclusions.tv_base_path = tv_base_path
-    settings.exclusions.ca_mover_log_path = ca_mover_log_path
-    settings.exclusions.full_sync_cron = full_sync_cron
-    settings.exclusions.log_monitor_cron = log_monitor_cron
-
     form_data = await request.form()
-    settings.exclusions.radarr_mapping = ServicePathMapping(
-        from_prefix=form_data.get("radarr_from", "").strip(),
-        to_prefix=form_data.get("radarr_to", "").strip()
-    )
-    settings.exclusions.sonarr_mapping = ServicePathMapping(
-        from_prefix=form_data.get("sonarr_from", "").strip(),
-        to_prefix=form_data.get("sonarr_to", "").strip()
-    )
-    settings.exclusions.plexcache_mapping = ServicePathMapping(
-        from_prefix=form_data.get("plexcache_from", "").strip(),
-        to_prefix=form_data.get("plexcache_to", "").strip()
-    )
 
-    save_user_settings(settings)
+    def apply(settings):
+        settings.exclusions.cache_mount_path = cache_mount_path
+        settings.exclusions.movie_base_path = movie_base_path
+        settings.exclusions.tv_base_path = tv_base_path
+        settings.exclusions.ca_mover_log_path = ca_mover_log_path
+        settings.exclusions.full_sync_cron = full_sync_cron
+        settings.exclusions.log_monitor_cron = log_monitor_cron
+        settings.exclusions.mover_log_retention_days = max(0, mover_log_retention_days)
+        settings.exclusions.mover_log_retention_action = "delete" if mover_log_retention_action == "delete" else "compress"
+        settings.exclusions.radarr_mapping = ServicePathMapping(
+            from_prefix=form_data.get("radarr_from", "").strip(),
+            to_prefix=form_data.get("radarr_to", "").strip()
+        )
+        settings.exclusions.sonarr_mapping = ServicePathMapping(
+            from_prefix=form_data.get("sonarr_from", "").strip(),
+            to_prefix=form_data.get("sonarr_to", "").strip()
+        )
+        settings.exclusions.plexcache_mapping = ServicePathMapping(
+            from_prefix=form_data.get("plexcache_from", "").strip(),
+            to_prefix=form_data.get("plexcache_to", "").strip()
+        )
+        settings.exclusions.radarr_extra_mappings = _parse_extra_mappings(form_data.get("radarr_extra", ""))
+        settings.exclusions.sonarr_extra_mappings = _parse_extra_mappings(form_data.get("sonarr_extra", ""))
+        settings.exclusions.plexcache_extra_mappings = _parse_extra_mappings(form_data.get("plexcache_extra", ""))
+
+    update_user_settings(apply)
     scheduler_service.reload_jobs()
     logger.info("System paths and schedules updated.")
     return RedirectResponse(url="/settings?status=success", status_code=303)
 
 @router.post("/radarr/save")
 async def save_radarr(url: str = Form(...), api_key: str = Form(...)):
-    settings = get_user_settings()
-    settings.radarr.url = url
-    settings.radarr.api_key = api_key
-    save_user_settings(settings)
-    try:
-        from app.services.radarr import get_radarr_client
-        get_radarr_client().get_all_movies()
+    def apply(settings):
+        settings.radarr.url = url
+        settings.radarr.api_key = api_key
+    update_user_settings(apply)
+    get_library_cache().invalidate("radarr")
+    from app.services.radarr import get_async_radarr_client
+    if await get_async_radarr_client().test_connection():
         return RedirectResponse(url="/settings?radarr_status=success", status_code=303)
-    except Exception:
-        return RedirectResponse(url="/settings?radarr_status=error", status_code=303)
+    return RedirectResponse(url="/settings?radarr_status=error", status_code=303)
 
 @router.post("/sonarr/save")
 async def save_sonarr(url: str = Form(...), api_key: str = Form(...)):
-    settings = get_user_settings()
-    settings.sonarr.url = url
-    settings.sonarr.api_key = api_key
-    save_user_settings(settings)
-    try:
-        from app.services.sonarr import get_sonarr_client
-        get_sonarr_client().get_all_series()
+    def apply(settings):
+        settings.sonarr.url = url
+        settings.sonarr.api_key = api_key
+    update_user_settings(apply)
+    get_library_cache().invalidate("sonarr")
+    from app.services.sonarr import get_async_sonarr_client
+    if await get_async_sonarr_client().test_connection():
         return RedirectResponse(url="/settings?sonarr_status=success", status_code=303)
-    except Exception:
-        return RedirectResponse(url="/settings?sonarr_status=error", status_code=303)
+    return RedirectResponse(url="/settings?sonarr_status=error", status_code=303)
 
 @router.get("/path-prefixes")
 async def get_path_prefixes():
     """Detect path prefixes from Radarr, Sonarr, and PlexCache"""
-    from app.services.radarr import get_radarr_client
-    from app.services.sonarr import get_sonarr_client
     from pathlib import Path
+    library = get_library_cache()
     results = {}
     try:
-        movies = get_radarr_client().get_all_movies()
+        movies = await library.aget("radarr_movies")
         for m in movies:
-            p = (m.get('movieFile', {}) or {}).get('path') or m.get('path', '')
+            p = m.file_path or m.path
             if p:
                 parts = p.lstrip('/').split('/')
                 results['Radarr'] = '/' + parts[0] + '/'
@@ -96,9 +113,9 @@ async def get_path_prefixes():
     except Exception as e:
         results['Radarr'] = f"Error: {e}"
     try:
-        shows = get_sonarr_client().get_all_series()
+        shows = await library.aget("sonarr_series")
         for s in shows:
-            p = s.get('path', '')
+            p = s.path
             if p:
                 parts = p.lstrip('/').split('/')
                 results['Sonarr'] = '/' + parts[0] + '/'
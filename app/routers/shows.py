@@ -1,52 +1,66 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from typing import List
+import asyncio
 import logging
 
-from app.services.sonarr import get_sonarr_client
+from app.services.library_cache import get_library_cache
+from app.services.library_index import get_library_index
+from app.services.media import TagTable
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
 
-@router.get("/", response_class=HTMLResponse)
-async def shows_page(request: Request):
-    """Shows listing page - shows all TV shows from Sonarr"""
-    sonarr_client = get_sonarr_client()
-    
-    shows = []
-    
+async def _show_index():
+    library = get_library_cache()
+    shows, tag_table = [], TagTable([])
     try:
-        # Get all series and tags from Sonarr
-        all_series = sonarr_client.get_all_series()
-        all_tags = sonarr_client.get_all_tags()
-        
-        # Create tag ID to label mapping
-        tag_map = {tag['id']: tag['label'] for tag in all_tags}
-        
-        for series in all_series:
-            # Map tag IDs to tag labels
-            tag_ids = series.get('tags', [])
-            tag_labels = [tag_map.get(tag_id, f"Unknown Tag {tag_id}") for tag_id in tag_ids]
-            
-            shows.append({
-                'id': series['id'],
-                'title': series['title'],
-                'year': series.get('year', 'N/A'),
-                'seasons': series.get('seasonCount', 0),
-                'tags': tag_labels
-            })
+        # Series records and tag table from the shared library cache
+        shows, tag_table = await asyncio.gather(library.aget("sonarr_series"), library.aget("sonarr_tags"))
     except Exception as e:
         logger.error(f"Failed to fetch shows: {e}")
-    
-    all_tag_labels = sorted(set(tag for s in shows for tag in s['tags']))
+    # Rebuilding after a library change sorts and tokenizes every title, so keep it off the event loop
+    return await run_in_threadpool(get_library_index, "sonarr", shows, tag_table)
+
+
+@router.get("/", response_class=HTMLResponse)
+async def shows_page(request: Request):
+    """Shows listing page - rows are loaded page by page from /shows/api"""
+    index = await _show_index()
 
     context = {
         "request": request,
-        "shows": shows,
-        "total": len(shows),
-        "all_tags": all_tag_labels
+        "total": len(index.records),
+        "all_tags": index.tags()
     }
     
     return templates.TemplateResponse("shows.html", context)
+
+
+@router.get("/api")
+async def shows_api(
+    q: str = "",
+    tag: List[int] = Query([]),
+    untagged: bool = False,
+    sort: str = Query("title", pattern="^(title|year|seasons)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+):
+    """One page of shows, filtered by title words and tag IDs (all must match)"""
+    index = await _show_index()
+    total, page = index.search(q, tag, untagged, sort, order == "desc", offset, limit)
+    labels_for = index.tag_table.labels_for
+    return {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "items": [
+            {"id": s.id, "title": s.title, "year": s.year, "seasons": s.season_count, "tags": labels_for(s.tags)}
+            for s in page
+        ],
+    }
@@ -1,37 +1,59 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from app.services.ca_mover import get_mover_parser
-import re
+from app.services.mover_history import get_mover_history
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
-def parse_size_to_gb(size_str):
-    """Helper to convert various size strings (GB, MB, KB) to a float in GB"""
-    try:
-        num = float(re.findall(r"[-+]?\d*\.\d+|\d+", size_str)[0])
-        if 'TB' in size_str: return num * 1024
-        if 'GB' in size_str: return num
-        if 'MB' in size_str: return num / 1024
-        if 'KB' in size_str: return num / (1024 * 1024)
-        return 0
-    except: return 0
-
 @router.get("", response_class=HTMLResponse)
 async def stats_page(request: Request):
     mover_parser = get_mover_parser()
-    stats = mover_parser.get_latest_stats()
-    
-    # Calculate Total Size Protected
-    total_gb = sum(parse_size_to_gb(f.get('size', '0')) for f in stats.get('protected_files', []))
-    if total_gb > 1024:
-        display_total = f"{round(total_gb/1024, 2)} TB"
-    else:
-        display_total = f"{round(total_gb, 2)} GB"
+    stats = mover_parser.get_latest_stats(include_files=False) or {
+        "filename": "No logs found", "type_label": "N/A", "is_run": False,
+        "excluded": 0, "moved": 0, "protected_bytes": 0
+    }
+    rollup = await run_in_threadpool(mover_parser.get_protected_rollup, 10)
 
     return templates.TemplateResponse("stats.html", {
         "request": request,
         "stats": stats,
-        "total_protected_size": display_total
+        "rollup": rollup,
+        "total_protected_size": rollup["total_size"]
     })
+
+@router.get("/api/protected")
+async def protected_files(
+    q: str = "",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+):
+    """Page through the files the shown run kept on cache, with exact byte sizes"""
+    return await run_in_threadpool(get_mover_parser().search_protected, q.strip(), offset, limit)
+
+@router.get("/api/protected/rollup")
+async def protected_rollup(top: int = Query(25, ge=1, le=1000)):
+    """Protected bytes per share, series and movie folder"""
+    return await run_in_threadpool(get_mover_parser().get_protected_rollup, top)
+
+@router.get("/api/history")
+async def history_summary():
+    """Number and time span of the runs in the history database"""
+    return await run_in_threadpool(get_mover_history().summary)
+
+@router.get("/api/history/daily")
+async def history_daily(days: int = Query(30, ge=1, le=3650)):
+    """Moved and excluded files and bytes per day"""
+    return await run_in_threadpool(get_mover_history().bytes_per_day, days)
+
+@router.get("/api/history/top-titles")
+async def history_top_titles(limit: int = Query(20, ge=1, le=500)):
+    """Largest protected titles in the newest true run"""
+    return await run_in_threadpool(get_mover_history().top_protected_titles, limit)
+
+@router.get("/api/history/skips")
+async def history_skips(limit: int = Query(50, ge=1, le=1000)):
+    """Paths kept on cache in the most runs"""
+    return await run_in_threadpool(get_mover_history().skip_frequency, limit)
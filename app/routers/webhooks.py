@@ -0,0 +1,37 @@
+import secrets
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import get_user_settings
+from app.services.webhooks import handle_radarr_event, handle_sonarr_event
+
+router = APIRouter()
+
+
+async def _payload(request: Request, token: str) -> dict:
+    expected = get_user_settings().exclusions.webhook_token
+    if expected and not secrets.compare_digest(token, expected):
+        raise HTTPException(status_code=403, detail="Invalid webhook token")
+    try:
+        return await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Expected a JSON webhook payload")
+
+
+@router.post("/radarr")
+async def radarr_webhook(request: Request, token: str = ""):
+    """Radarr Connect > Webhook: updates the exclusion entries of the movie in the event"""
+    payload = await _payload(request, token)
+    try:
+        return await run_in_threadpool(handle_radarr_event, payload)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Radarr webhook not applied: {e}")
+
+
+@router.post("/sonarr")
+async def sonarr_webhook(request: Request, token: str = ""):
+    """Sonarr Connect > Webhook: updates the exclusion entries of the series in the event"""
+    payload = await _payload(request, token)
+    try:
+        return await run_in_threadpool(handle_sonarr_event, payload)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Sonarr webhook not applied: {e}")
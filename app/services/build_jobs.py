@@ -0,0 +1,174 @@
+"""
+Single-flight background runner for exclusion builds, shared by manual triggers and the scheduler
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Optional
+
+from app.core.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+BUILDS = get_registry().counter("exclusion_builds_total", "Finished exclusion builds by trigger and outcome", ("trigger", "status"))
+BUILD_SECONDS = get_registry().histogram("exclusion_build_seconds", "Wall time of exclusion builds by outcome", ("status",))
+LAST_SUCCESS = get_registry().gauge("exclusion_build_last_success_timestamp_seconds", "Unix time the last successful build finished")
+
+# Finished jobs kept for the status endpoint
+HISTORY_SIZE = 20
+
+
+class BuildCancelled(Exception):
+    pass
+
+
+class BuildJob:
+    """One exclusion build: its status plus the phase and item progress the builder reports"""
+    def __init__(self, trigger: str = "manual"):
+        self.id = uuid.uuid4().hex
+        self.trigger = trigger
+        self.status = "queued"
+        self.phase = None
+        self.processed = 0
+        self.total = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
+
+    def set_phase(self, phase: str, total: Optional[int] = None):
+        self.phase, self.processed, self.total = phase, 0, total
+
+    def advance(self, count: int = 1):
+        self.processed += count
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise BuildCancelled between phases if cancellation was requested"""
+        if self.cancel_event.is_set():
+            raise BuildCancelled(f"Build {self.id} cancelled during {self.phase or 'startup'}")
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "status": self.status,
+            "phase": self.phase,
+            "processed": self.processed,
+            "total": self.total,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed": round(end - self.started_at, 1) if self.started_at else 0,
+            "cancel_requested": self.cancelled,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class BuildJobRunner:
+    """Runs at most one build at a time on a background thread.
+
+    A trigger while a build is running queues one follow-up build, since the
+    running one may have started before whatever prompted the trigger; any
+    further triggers join that queued build instead of adding more. Callers
+    get the job back immediately and poll it by ID.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current: Optional[BuildJob] = None
+        self.queued: Optional[BuildJob] = None
+        self.history = deque(maxlen=HISTORY_SIZE)
+
+    def submit(self, trigger: str = "manual") -> BuildJob:
+        with self.lock:
+            if self.queued is not None:
+                return self.queued
+            job = BuildJob(trigger)
+            if self.current is not None:
+                self.queued = job
+                logger.info(f"Build {job.id} ({trigger}) queued behind {self.current.id}")
+                return job
+            self.current = job
+        threading.Thread(target=self._worker, name="exclusion-build", daemon=True).start()
+        return job
+
+    def _worker(self):
+        while True:
+            job = self.current
+            self._execute(job)
+            with self.lock:
+                self.history.appendleft(job)
+                self.current, self.queued = self.queued, None
+                if self.current is None:
+                    return
+
+    def _execute(self, job: BuildJob):
+        from app.services.exclusions import get_exclusion_manager
+        job.status, job.started_at = "running", time.time()
+        logger.info(f"Build {job.id} ({job.trigger}) started")
+        try:
+            job.check_cancelled()
+            job.result = get_exclusion_manager().build_exclusions(job)
+            job.status = "succeeded"
+        except BuildCancelled as e:
+            job.status = "cancelled"
+            logger.info(str(e))
+        except Exception as e:
+            job.status, job.error = "failed", str(e)
+            logger.error(f"Build {job.id} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+            BUILDS.inc(trigger=job.trigger, status=job.status)
+            BUILD_SECONDS.observe(job.finished_at - job.started_at, status=job.status)
+            if job.status == "succeeded":
+                LAST_SUCCESS.set(job.finished_at)
+            job.done.set()
+
+    def cancel(self, job_id: str) -> Optional[BuildJob]:
+        """Request cancellation; a queued job is dropped at once, a running one stops at its next checkpoint"""
+        with self.lock:
+            job = self._find(job_id)
+            if job is None or job.done.is_set():
+                return job
+            job.cancel_event.set()
+            if job is self.queued:
+                self.queued = None
+                job.status, job.finished_at = "cancelled", time.time()
+                job.done.set()
+                self.history.appendleft(job)
+            return job
+
+    def _find(self, job_id: str) -> Optional[BuildJob]:
+        for job in (self.current, self.queued, *self.history):
+            if job is not None and job.id == job_id:
+                return job
+        return None
+
+    def get(self, job_id: str) -> Optional[BuildJob]:
+        with self.lock:
+            return self._find(job_id)
+
+    def status(self) -> dict:
+        with self.lock:
+            current, queued, recent = self.current, self.queued, list(self.history)
+        return {
+            "current": current.to_dict() if current else None,
+            "queued": queued.to_dict() if queued else None,
+            "recent": [job.to_dict() for job in recent],
+        }
+
+# Singleton instance
+_build_runner = BuildJobRunner()
+
+def get_build_runner():
+    return _build_runner
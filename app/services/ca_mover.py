@@ -1,10 +1,15 @@
-import os
 import logging
 import shutil
 from app.core.config import get_user_settings
+from app.core.metrics import get_registry
+from app.services.mover_index import get_mover_index
+from app.services.protected_files import ProtectedFiles
 
 logger = logging.getLogger(__name__)
 
+REFRESH_SECONDS = get_registry().histogram("mover_log_refresh_seconds", "Time spent refreshing the mover log index, by step", ("step",))
+INDEXED_RUNS = get_registry().gauge("mover_indexed_lists", "Filtered_files lists currently in the mover index")
+
 def format_size(size_bytes):
     if size_bytes == "Unknown": return "0 B"
     try:
@@ -13,75 +18,74 @@ def format_size(size_bytes):
             if size < 1024.0:
                 return f"{size:.1f} {unit}"
             size /= 1024.0
+        return f"{size:.1f} PB"
     except: return "0 B"
 
 class MoverLogParser:
     def __init__(self, log_dir="/mover_logs"):
         self.log_dir = log_dir
 
-    def _get_files_by_type(self):
-        true_runs, idle_checks = [], []
-        if not os.path.exists(self.log_dir): return [], []
-        for entry in os.scandir(self.log_dir):
-            if entry.name.startswith("Filtered_files_") and entry.name.endswith(".list"):
-                timestamp_str = entry.name.replace("Filtered_files_", "").replace(".list", "")
-                log_set = {
-                    "timestamp": timestamp_str,
-                    "mtime": entry.stat().st_mtime,
-                    "list_path": entry.path,
-                    "log_path": os.path.join(self.log_dir, f"Mover_tuning_{timestamp_str}.log")
-                }
-                if entry.stat().st_size > 500: true_runs.append(log_set)
-                else: idle_checks.append(log_set)
-        return sorted(true_runs, key=lambda x: x['mtime'], reverse=True), \
-               sorted(idle_checks, key=lambda x: x['mtime'], reverse=True)
+    def refresh_index(self):
+        """Parse any new mover lists and apply log retention (scheduler job); requests only read the index"""
+        index = get_mover_index()
+        with REFRESH_SECONDS.time(step="update"):
+            parsed = index.update()
+        exclusions = get_user_settings().exclusions
+        if exclusions.mover_log_retention_days > 0:
+            with REFRESH_SECONDS.time(step="retention"):
+                index.apply_retention(exclusions.mover_log_retention_days, exclusions.mover_log_retention_action)
+        INDEXED_RUNS.set(index.count())
+        return parsed
 
-    def get_latest_stats(self):
-        true_runs, idle_checks = self._get_files_by_type()
-        latest = true_runs[0] if true_runs else (idle_checks[0] if idle_checks else None)
+    def get_latest_stats(self, include_files=True):
+        """Stats for the newest true run (else the newest idle check), served from the mover index"""
+        latest = get_mover_index().latest()
         if not latest: return None
         
-        is_true = latest in true_runs
-        stats = {
-            "filename": os.path.basename(latest['log_path']),
-            "type_label": "True-Mover Run" if is_true else "Idle-Mover Check",
-            "is_run": is_true,
-            "excluded": 0,
-            "moved": 0,
-            "timestamp": latest['mtime'],
-            "protected_files": []
+        _, run, protected = latest
+        return {
+            "filename": run['log_name'],
+            "type_label": "True-Mover Run" if run['is_run'] else "Idle-Mover Check",
+            "is_run": run['is_run'],
+            "excluded": run['excluded'],
+            "moved": run['moved'],
+            "excluded_bytes": run['excluded_bytes'],
+            "moved_bytes": run['moved_bytes'],
+            "timestamp": run['mtime'],
+            "protected_bytes": protected.rollup(top=0)["total_bytes"],
+            "protected_files": [{"path": path, "bytes": size, "size": format_size(size)} for path, size in protected] if include_files else []
         }
 
-        try:
-            with open(latest['list_path'], 'r') as f:
-                for line in f:
-                    if "|" in line:
-                        parts = [p.strip() for p in line.split("|")]
-                        # Column 3 is status. If skipped, Column 4 is usually Path, Column 6 is size.
-                        if len(parts) >= 11:
-                            status = parts[3].lower()
-                            if status == "skipped":
-                                stats["excluded"] += 1
-                                # We want the actual Path (often index 4 or 10)
-                                path_val = parts[10] if len(parts[10]) > 5 else parts[4]
-                                stats["protected_files"].append({
-                                    "path": path_val,
-                                    "size": format_size(parts[6])
-                                })
-                            elif status == "yes":
-                                stats["moved"] += 1
-            return stats
-        except Exception as e:
-            logger.error(f"Failed to parse list: {e}")
-            return stats
+    def get_protected_rollup(self, top=25):
+        """Exact protected bytes of the shown run, in total and per share, series and movie folder"""
+        latest = get_mover_index().latest()
+        protected = latest[2] if latest else ProtectedFiles()
+        rollup = protected.rollup(top)
+        for kind in ("shares", "series", "movies"):
+            for group in rollup[kind]:
+                group["size"] = format_size(group["bytes"])
+        rollup["total_size"] = format_size(rollup["total_bytes"])
+        return rollup
+
+    def search_protected(self, q="", offset=0, limit=200):
+        """One page of the shown run's protected files, optionally filtered by a path substring"""
+        latest = get_mover_index().latest()
+        protected = latest[2] if latest else ProtectedFiles()
+        total, rows = protected.search(q, offset, limit)
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "items": [{"path": path, "bytes": size, "size": format_size(size)} for path, size in rows],
+        }
 
     def get_cache_usage(self):
         try:
             settings = get_user_settings()
             usage = shutil.disk_usage(settings.exclusions.cache_mount_path or "/mnt/cache")
             percent = (usage.used / usage.total) * 100 if usage.total > 0 else 0
-            return {"percent": round(percent, 1), "used": usage.used}
-        except: return {"percent": 0, "used": 0}
+            return {"percent": round(percent, 1), "used": usage.used, "total": usage.total}
+        except: return {"percent": 0, "used": 0, "total": 0}
 
 def get_mover_parser():
     return MoverLogParser()
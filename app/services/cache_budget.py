@@ -0,0 +1,194 @@
+"""
+Budgeted selection of tagged titles under a maximum cache fill percentage.
+
+The budget is what the pool may hold at cache_max_fill_percent, minus
+cache_reserved_gb for data Mover can't move (cache-only shares such as
+appdata, custom folders). It doesn't depend on how full the cache happens to
+be, so downloads waiting for Mover never squeeze pinned titles out. Pinned
+media stays within the limit only as far as the reserve is accurate and
+Mover moves everything else off.
+
+Titles are kept by priority (highest first), smaller titles first within a
+priority; a title that doesn't fit is dropped whole and the rest still fill
+the remaining space. Webhook updates between builds are admitted into
+whatever budget the last build left, without displacing kept titles.
+"""
+import datetime
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from app.core.metrics import get_registry
+from app.services.ca_mover import format_size, get_mover_parser
+
+logger = logging.getLogger(__name__)
+
+BUDGET_PATH = "/config/cache_budget.json"
+# Dropped titles listed in the report; the count and bytes always cover all of them
+DROPPED_LIST_SIZE = 500
+
+BUDGET_BYTES = get_registry().gauge(
+    "cache_budget_bytes", "Cache budget of the last build: budget, pinned (on cache), kept and dropped bytes", ("kind",))
+DROPPED_TITLES = get_registry().gauge("cache_budget_dropped_titles", "Titles left out of the exclusion file by the cache budget")
+
+
+class BudgetItem:
+    """One title competing for the budget: a movie, a series, or a single PlexCache path"""
+    __slots__ = ("key", "source", "title", "priority", "size", "paths")
+
+    def __init__(self, key: str, source: str, title: str, priority: int):
+        self.key = key
+        self.source = source
+        self.title = title
+        self.priority = priority
+        self.size = 0
+        self.paths = []
+
+    def add(self, path: str, size: int):
+        self.paths.append(path)
+        self.size += size or 0
+
+
+def tag_priority(tags, exclude_tag_ids, priorities: Dict[int, int]) -> int:
+    """A title's priority is the highest priority among its exclude tags; unlisted tags count as 0"""
+    return max((priorities.get(t, 0) for t in tags if t in exclude_tag_ids), default=0)
+
+
+def select_within_budget(items: Iterable[BudgetItem], budget: int):
+    """Split items into (kept, dropped) so the kept sizes add up to at most budget"""
+    kept, dropped = [], []
+    used = 0
+    for item in sorted(items, key=lambda i: (-i.priority, i.size, i.title)):
+        if used + item.size <= budget:
+            kept.append(item)
+            used += item.size
+        else:
+            dropped.append(item)
+    return kept, dropped
+
+
+class CacheBudget:
+    def __init__(self, path=BUDGET_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.report = None
+        self._loaded = False
+
+    def apply(self, items: List[BudgetItem], max_fill_percent: float, reserved_bytes: int = 0) -> Optional[List[BudgetItem]]:
+        """Kept items under the budget, or None (keep everything) if the cache size can't be read"""
+        usage = get_mover_parser().get_cache_usage()
+        if not usage.get("total"):
+            logger.error("Cache budget skipped: cache mount usage could not be read")
+            return None
+        pinned = sum(i.size for i in items)
+        budget = max(0, int(usage["total"] * max_fill_percent / 100) - reserved_bytes)
+        kept, dropped = select_within_budget(items, budget)
+        kept_bytes = sum(i.size for i in kept)
+        dropped_bytes = pinned - kept_bytes
+
+        report = {
+            "created": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "max_fill_percent": max_fill_percent,
+            "total_bytes": usage["total"],
+            "used_bytes": usage["used"],
+            "reserved_bytes": reserved_bytes,
+            "budget_bytes": budget,
+            "pinned_bytes": pinned,
+            "kept_bytes": kept_bytes,
+            "dropped_bytes": dropped_bytes,
+            "kept_count": len(kept),
+            "dropped_count": len(dropped),
+            "budget_size": format_size(budget),
+            "pinned_size": format_size(pinned),
+            "dropped_size": format_size(dropped_bytes),
+            "kept_keys": [i.key for i in kept],
+            "dropped_keys": [i.key for i in dropped],
+            "dropped": [
+                {"title": i.title, "source": i.source, "priority": i.priority, "bytes": i.size, "size": format_size(i.size)}
+                for i in dropped[:DROPPED_LIST_SIZE]
+            ],
+        }
+        with self.lock:
+            self.report, self._loaded = report, True
+            self._save()
+        BUDGET_BYTES.set(budget, kind="budget")
+        BUDGET_BYTES.set(pinned, kind="pinned")
+        BUDGET_BYTES.set(kept_bytes, kind="kept")
+        BUDGET_BYTES.set(dropped_bytes, kind="dropped")
+        DROPPED_TITLES.set(len(dropped))
+        if dropped:
+            logger.warning(
+                f"Cache budget ({format_size(budget)} at {max_fill_percent}% fill): dropped {len(dropped)} titles "
+                f"({format_size(dropped_bytes)}), e.g. {', '.join(i.title for i in dropped[:5])}"
+            )
+        else:
+            logger.info(f"Cache budget ({format_size(budget)} at {max_fill_percent}% fill): all {len(kept)} titles fit")
+        return kept
+
+    def _save(self):
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.report, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save cache budget report: {e}")
+
+    def last_report(self) -> Optional[dict]:
+        """Report of the last budgeted build, or None if no build has used the budget"""
+        with self.lock:
+            if not self._loaded:
+                self._loaded = True
+                if os.path.exists(self.path):
+                    try:
+                        with open(self.path, 'r') as f:
+                            self.report = json.load(f)
+                    except Exception as e:
+                        logger.warning(f"Discarding unreadable cache budget report: {e}")
+            return self.report
+
+    def admit(self, item: BudgetItem) -> bool:
+        """Whether a title from a webhook fits in what the last build's budget has left.
+
+        Titles the build kept stay kept and titles it dropped stay dropped
+        until the next build; a new title is kept only if it fits in the
+        remaining budget, and is recorded in the report either way.
+        """
+        report = self.last_report()
+        if not report:
+            return True
+        with self.lock:
+            if item.key in report.get("kept_keys", ()):
+                return True
+            if item.key in report["dropped_keys"]:
+                return False
+            kept, _ = select_within_budget([item], report["budget_bytes"] - report["kept_bytes"])
+            if kept:
+                report["kept_bytes"] += item.size
+                report["kept_count"] += 1
+                report.setdefault("kept_keys", []).append(item.key)
+            else:
+                report["dropped_bytes"] += item.size
+                report["dropped_count"] += 1
+                report["dropped_size"] = format_size(report["dropped_bytes"])
+                report["dropped_keys"].append(item.key)
+                if len(report["dropped"]) < DROPPED_LIST_SIZE:
+                    report["dropped"].append({"title": item.title, "source": item.source, "priority": item.priority,
+                                              "bytes": item.size, "size": format_size(item.size)})
+                logger.warning(f"Cache budget: '{item.title}' ({format_size(item.size)}) doesn't fit, left out until the next build")
+            report["pinned_bytes"] += item.size
+            report["pinned_size"] = format_size(report["pinned_bytes"])
+            self._save()
+        BUDGET_BYTES.set(report["pinned_bytes"], kind="pinned")
+        BUDGET_BYTES.set(report["kept_bytes"], kind="kept")
+        BUDGET_BYTES.set(report["dropped_bytes"], kind="dropped")
+        DROPPED_TITLES.set(report["dropped_count"])
+        return bool(kept)
+
+# Singleton instance
+_cache_budget = CacheBudget()
+
+def get_cache_budget():
+    return _cache_budget
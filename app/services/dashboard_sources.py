@@ -0,0 +1,78 @@
+"""
+Concurrent dashboard data sources with per-source deadlines and last-known-good fallbacks
+"""
+import asyncio
+import datetime
+import logging
+from typing import Any, Awaitable, Callable, Dict, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class Source(NamedTuple):
+    fetch: Callable[[], Awaitable[Any]]
+    deadline: float
+    default: Any = None
+
+
+class SourceResult(NamedTuple):
+    value: Any
+    # None when the value came back within the deadline
+    stale_since: Any = None
+    # False when the source has never answered and value is only its default
+    known: bool = True
+
+
+class LastKnownGood:
+    """Runs every source at once and waits on each only up to its own deadline.
+
+    A source that misses its deadline or fails is shown with the last value
+    it returned, marked with when that value was fetched. Fetches are not
+    cancelled at the deadline: a late answer still becomes the last-known
+    value for the next view, and a source is never fetched twice at once.
+    """
+    def __init__(self):
+        self.values: Dict[str, tuple] = {}
+        self.inflight: Dict[str, asyncio.Task] = {}
+
+    def _record(self, name: str, task: asyncio.Task):
+        if self.inflight.get(name) is task:
+            del self.inflight[name]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.warning(f"Dashboard source {name} failed: {task.exception()}")
+            return
+        self.values[name] = (task.result(), datetime.datetime.now())
+
+    def _start(self, name: str, source: Source) -> asyncio.Task:
+        task = self.inflight.get(name)
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(source.fetch())
+            task.add_done_callback(lambda t, name=name: self._record(name, t))
+            self.inflight[name] = task
+        return task
+
+    async def _get(self, name: str, source: Source) -> SourceResult:
+        task = self._start(name, source)
+        try:
+            return SourceResult(await asyncio.wait_for(asyncio.shield(task), source.deadline))
+        except asyncio.TimeoutError:
+            logger.warning(f"Dashboard source {name} missed its {source.deadline}s deadline")
+        except Exception:
+            pass  # Logged by _record
+        if name in self.values:
+            value, fetched_at = self.values[name]
+            return SourceResult(value, stale_since=fetched_at)
+        return SourceResult(source.default, known=False)
+
+    async def gather(self, sources: Dict[str, Source]) -> Dict[str, SourceResult]:
+        """Results for all sources; takes as long as the slowest deadline at most"""
+        results = await asyncio.gather(*(self._get(name, source) for name, source in sources.items()))
+        return dict(zip(sources, results))
+
+# Singleton instance
+_last_known_good = LastKnownGood()
+
+def get_last_known_good():
+    return _last_known_good
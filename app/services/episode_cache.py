@@ -0,0 +1,86 @@
+"""
+Persistent per-series cache of Sonarr episode files
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from app.services.media import EpisodeFile
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = "/config/episode_cache.json"
+# Bumped whenever the on-disk layout changes; older files are discarded
+CACHE_VERSION = 2
+
+
+class EpisodeFileCache:
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.entries = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self.entries = data["series"]
+            except Exception as e:
+                logger.warning(f"Discarding unreadable episode cache: {e}")
+
+    def get(self, series, max_age: int):
+        """Cached EpisodeFiles for a Series, or None if missing, changed or older than max_age seconds"""
+        with self.lock:
+            self._load()
+            entry = self.entries.get(str(series.id))
+        if not entry or entry.get('fingerprint') != series.fingerprint:
+            return None
+        if max_age and time.time() - entry.get('fetched', 0) > max_age:
+            return None
+        return [EpisodeFile.from_row(row) for row in entry['files']]
+
+    def put(self, series, episode_files):
+        with self.lock:
+            self._load()
+            self.entries[str(series.id)] = {
+                "fingerprint": series.fingerprint,
+                "fetched": time.time(),
+                "files": [ep.to_row() for ep in episode_files],
+            }
+            self.dirty = True
+
+    def prune(self, series_ids):
+        """Drop entries for series that are no longer in Sonarr"""
+        keep = {str(i) for i in series_ids}
+        with self.lock:
+            self._load()
+            for key in [k for k in self.entries if k not in keep]:
+                del self.entries[key]
+                self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({"version": CACHE_VERSION, "series": self.entries}, f)
+                os.replace(tmp_path, self.path)
+                self.dirty = False
+            except Exception as e:
+                logger.error(f"Failed to save episode cache: {e}")
+
+# Singleton instance
+_episode_cache = EpisodeFileCache()
+
+def get_episode_cache():
+    return _episode_cache
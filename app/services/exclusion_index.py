@@ -0,0 +1,202 @@
+"""
+Indexed, read-only view of the generated exclusion file for paging and search
+"""
+import bisect
+import logging
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXCLUSIONS_PATH = "/config/mover_exclusions.txt"
+_WORD = re.compile(r"\w+")
+# Per-term search results kept between keystrokes
+TERM_CACHE_SIZE = 64
+# Below this many candidates, the remaining lines are checked for the query text directly
+FILTER_THRESHOLD = 5000
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.casefold())
+
+
+class _Snapshot:
+    """Index over one version of the file; never modified after it is built, apart from the term cache"""
+    def __init__(self, content: bytes = b""):
+        self.content = content
+        self.starts = array('Q')
+        self.ends = array('Q')
+        self.is_sorted = True
+        self.postings = {}
+        self.term_cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+        previous = None
+        pos, n = 0, len(content)
+        while pos < n:
+            end = content.find(b"\n", pos)
+            if end == -1:
+                end = n
+            raw = content[pos:end]
+            line = raw.strip()
+            if line:
+                line_id = len(self.starts)
+                # Offsets of the stripped line, so slicing needs no further cleanup
+                lead = raw.find(line)
+                self.starts.append(pos + lead)
+                self.ends.append(pos + lead + len(line))
+                if previous is not None and line < previous:
+                    self.is_sorted = False
+                previous = line
+                for word in set(_words(line.decode('utf-8', errors='replace'))):
+                    # Lines are visited in order, so every posting list is sorted and unique
+                    self.postings.setdefault(word, array('I')).append(line_id)
+            pos = end + 1
+
+        self.vocab = sorted(self.postings)
+        # One newline-joined string of distinct words; str.find scans it in C
+        self.vocab_starts = []
+        offset = 0
+        for word in self.vocab:
+            self.vocab_starts.append(offset)
+            offset += len(word) + 1
+        self.vocab_blob = "\n".join(self.vocab)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line(self, i: int) -> str:
+        return self.content[self.starts[i]:self.ends[i]].decode('utf-8', errors='replace')
+
+    def line_bytes(self, i: int) -> bytes:
+        return self.content[self.starts[i]:self.ends[i]]
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """[lo, hi) line ids starting with prefix, by binary search over the sorted file"""
+        key = prefix.encode('utf-8')
+        ids = range(len(self.starts))
+        lo = bisect.bisect_left(ids, key, key=self.line_bytes)
+        hi = bisect.bisect_left(ids, key + b"\xff", lo=lo, key=self.line_bytes)
+        return lo, hi
+
+    def vocab_matches(self, term: str) -> List[str]:
+        """Distinct words containing term"""
+        words = []
+        blob, pos = self.vocab_blob, 0
+        while True:
+            pos = blob.find(term, pos)
+            if pos == -1:
+                return words
+            k = bisect.bisect_right(self.vocab_starts, pos) - 1
+            words.append(self.vocab[k])
+            # Continue from the next word so none is reported twice
+            pos = self.vocab_starts[k + 1] if k + 1 < len(self.vocab_starts) else len(blob)
+
+    def term_matches(self, term: str) -> Sequence[int]:
+        """Sorted line ids having a word that contains term"""
+        with self.cache_lock:
+            cached = self.term_cache.get(term)
+            if cached is not None:
+                self.term_cache.move_to_end(term)
+                return cached
+        lists = [self.postings[w] for w in self.vocab_matches(term)]
+        if len(lists) == 1:
+            matches = lists[0]
+        else:
+            matches = array('I', sorted(set().union(*lists)))
+        with self.cache_lock:
+            self.term_cache[term] = matches
+            if len(self.term_cache) > TERM_CACHE_SIZE:
+                self.term_cache.popitem(last=False)
+        return matches
+
+
+class ExclusionIndex:
+    """Line offsets and a word index over the exclusion file.
+
+    The file is re-read only when its mtime or size changes, and the new
+    index is swapped in whole, so readers never wait on a rebuild. Count and
+    page N are slices of the offset arrays. Queries starting with '/' are
+    path prefixes, answered by bisecting the sorted file. Other queries are
+    case-insensitive substrings of the line. Every word of such a query
+    occurs inside a word of a matching line, so candidates are narrowed
+    through the small vocabulary of distinct path words before the text
+    itself is checked.
+    """
+    def __init__(self, path=EXCLUSIONS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self._stamp = None
+        self._snapshot = _Snapshot()
+
+    def _current(self) -> _Snapshot:
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._stamp:
+            return self._snapshot
+        with self.lock:
+            if stamp != self._stamp:
+                snapshot = _Snapshot()
+                if stamp is not None:
+                    try:
+                        with open(self.path, 'rb') as f:
+                            snapshot = _Snapshot(f.read())
+                        logger.info(f"Indexed exclusion file: {len(snapshot)} lines, {len(snapshot.vocab)} distinct words")
+                    except Exception as e:
+                        logger.error(f"Failed to index exclusion file: {e}")
+                self._snapshot, self._stamp = snapshot, stamp
+            return self._snapshot
+
+    def count(self) -> int:
+        return len(self._current())
+
+    def lines(self) -> List[str]:
+        snap = self._current()
+        return [snap.line(i) for i in range(len(snap))]
+
+    def search(self, q: str = "", offset: int = 0, limit: int = 100) -> Tuple[int, List[str]]:
+        """(total matches, lines on the requested page) in file order"""
+        snap = self._current()
+        q = q.strip()
+        if not q:
+            total = len(snap)
+            ids = range(offset, min(offset + limit, total))
+        elif q.startswith('/') and snap.is_sorted:
+            lo, hi = snap.prefix_range(q)
+            total = hi - lo
+            ids = range(lo + offset, min(lo + offset + limit, hi))
+        elif q.startswith('/'):
+            ids = [i for i in range(len(snap)) if snap.line(i).startswith(q)]
+            total = len(ids)
+            ids = ids[offset:offset + limit]
+        else:
+            needle = q.casefold()
+            # Most selective word first, then narrow its matches by the rest
+            terms = sorted(set(_words(q)), key=lambda t: len(snap.term_matches(t)))
+            matches = snap.term_matches(terms[0]) if terms else range(len(snap))
+            if terms != [needle]:
+                # A single bare word is answered by the index alone; anything else is checked against the text
+                for term in terms[1:]:
+                    if len(matches) <= FILTER_THRESHOLD:
+                        break
+                    if len(snap.term_matches(term)) == len(snap):
+                        continue
+                    other = set(snap.term_matches(term))
+                    matches = [i for i in matches if i in other]
+                matches = [i for i in matches if needle in snap.line(i).casefold()]
+            total = len(matches)
+            ids = matches[offset:offset + limit]
+        return total, [snap.line(i) for i in ids]
+
+# Singleton instance
+_exclusion_index = ExclusionIndex()
+
+def get_exclusion_index():
+    return _exclusion_index
@@ -0,0 +1,141 @@
+"""
+Persisted set of exclusion entries (mapped path -> source) behind the exclusion file.
+
+A full build replaces the whole set; webhook events replace only the entries
+of one movie or series. Either way the file is rewritten from the set, so
+the two never need to re-read or diff the file itself.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable
+
+from app.core.metrics import get_registry
+from app.services.exclusion_index import EXCLUSIONS_PATH, get_exclusion_index
+from app.services.exclusion_writer import write_exclusion_file
+from app.services.stats_cache import get_stats_cache
+
+logger = logging.getLogger(__name__)
+
+SET_PATH = "/config/exclusion_set.json"
+# Bumped whenever the on-disk layout changes; older files are discarded
+SET_VERSION = 1
+# Recent title updates kept for replaying over a build that was running when they arrived
+JOURNAL_SIZE = 1000
+# Where sources overlap Radarr wins, then Sonarr, then PlexCache, as in the full build
+PRECEDENCE = {"": 0, "plexcache": 1, "sonarr": 2, "radarr": 3}
+
+SET_WRITES = get_registry().counter("exclusion_set_writes_total", "Exclusion file rewrites by cause", ("cause",))
+
+
+class TitleUpdate:
+    """The exclusion entries of one movie or series.
+
+    roots are the mapped folders the title owns (its current folder plus any
+    previous one); every entry of the same source under a root is replaced
+    by paths.
+    """
+    __slots__ = ("source", "roots", "paths")
+
+    def __init__(self, source: str, roots: Iterable[str], paths: Iterable[str]):
+        self.source = source
+        self.roots = tuple(r.rstrip('/') for r in roots if r and r.rstrip('/'))
+        self.paths = tuple(paths)
+
+    def owns(self, path: str) -> bool:
+        return any(path == root or path.startswith(root + '/') for root in self.roots)
+
+    def apply(self, entries: Dict[str, str]):
+        """Apply to entries in place"""
+        for p in [p for p, source in entries.items() if source == self.source and self.owns(p)]:
+            del entries[p]
+        rank = PRECEDENCE.get(self.source, 0)
+        for p in self.paths:
+            if PRECEDENCE.get(entries.get(p), -1) <= rank:
+                entries[p] = self.source
+
+
+class ExclusionSet:
+    def __init__(self, path=EXCLUSIONS_PATH, set_path=SET_PATH):
+        self.path = path
+        self.set_path = set_path
+        self.lock = threading.Lock()
+        self.entries = None
+        self.journal = deque(maxlen=JOURNAL_SIZE)
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if os.path.exists(self.set_path):
+            try:
+                with open(self.set_path, 'r') as f:
+                    data = json.load(f)
+                if data.get("version") == SET_VERSION:
+                    self.entries = data["entries"]
+                    return
+            except Exception as e:
+                logger.warning(f"Discarding unreadable exclusion set: {e}")
+        # No set yet (first run after an upgrade): start from the file; sources are filled in by the next build
+        self.entries = dict.fromkeys(get_exclusion_index().lines(), "")
+
+    def _save(self):
+        try:
+            tmp_path = f"{self.set_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"version": SET_VERSION, "entries": self.entries}, f)
+            os.replace(tmp_path, self.set_path)
+        except Exception as e:
+            logger.error(f"Failed to save exclusion set: {e}")
+
+    def _commit(self, entries: Dict[str, str], cause: str) -> dict:
+        write_result = write_exclusion_file(self.path, sorted(entries))
+        self.entries = entries
+        self._save()
+        SET_WRITES.inc(cause=cause)
+        if write_result["changed"]:
+            # Re-index here so the next page view doesn't pay for it
+            get_exclusion_index().count()
+        # Dashboard counts come from each path's source, not from re-reading the file
+        get_stats_cache().update_from_build(entries)
+        return write_result
+
+    def replace(self, entries: Dict[str, str], since: float = None) -> dict:
+        """Replace the whole set with a build's result and rewrite the file.
+
+        Title updates applied at or after since (the build's start) are
+        replayed on top, since the build may have fetched their titles
+        before the change.
+        """
+        entries = dict(entries)
+        with self.lock:
+            replayed = 0
+            if since is not None:
+                for applied_at, update in self.journal:
+                    if applied_at >= since:
+                        update.apply(entries)
+                        replayed += 1
+            if replayed:
+                logger.info(f"Replayed {replayed} webhook updates received during the build")
+            return self._commit(entries, "build")
+
+    def apply(self, update: TitleUpdate) -> dict:
+        """Replace one title's entries and rewrite the file"""
+        with self.lock:
+            self._load()
+            previous = self.entries
+            entries = dict(previous)
+            update.apply(entries)
+            self.journal.append((time.time(), update))
+            if entries == previous:
+                return {"changed": False, "added": 0, "removed": 0}
+            return self._commit(entries, "webhook")
+
+# Singleton instance
+_exclusion_set = ExclusionSet()
+
+def get_exclusion_set():
+    return _exclusion_set
@@ -0,0 +1,67 @@
+"""
+Atomic, change-aware writer for the CA Mover exclusion file
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+
+def _read_existing(output_file: Path):
+    """Content hash and set of lines of the current exclusion file"""
+    digest = hashlib.sha256()
+    lines = set()
+    if output_file.exists():
+        with open(output_file, 'rb') as f:
+            for raw in f:
+                digest.update(raw)
+                line = raw.decode('utf-8', errors='replace').strip()
+                if line:
+                    lines.add(line)
+    return digest.hexdigest(), lines
+
+
+def write_exclusion_file(output_file: Path, paths: Iterable[str]) -> dict:
+    """Stream paths to a temp file and rename it over output_file only if the content changed.
+
+    CA Mover may read the file at any moment, so it is never truncated in
+    place, and an unchanged build leaves its mtime untouched.
+    """
+    output_file = Path(output_file)
+    previous_hash, previous = _read_existing(output_file)
+
+    digest = hashlib.sha256()
+    current = set()
+    tmp_path = output_file.with_name(output_file.name + ".tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            for path in paths:
+                raw = f"{path}\n".encode('utf-8')
+                digest.update(raw)
+                f.write(raw)
+                current.add(path)
+            f.flush()
+            os.fsync(f.fileno())
+
+        content_hash = digest.hexdigest()
+        changed = content_hash != previous_hash or not output_file.exists()
+        if changed:
+            os.replace(tmp_path, output_file)
+        else:
+            os.unlink(tmp_path)
+    except Exception:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+    result = {
+        "changed": changed,
+        "added": len(current - previous),
+        "removed": len(previous - current),
+        "hash": content_hash,
+    }
+    logger.info(f"Exclusion file {'updated' if changed else 'unchanged'}: +{result['added']} / -{result['removed']}")
+    return result
@@ -1,66 +1,125 @@
 import logging
 import os
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 from pathlib import Path
-from app.core.config import get_user_settings, save_user_settings
-from app.services.radarr import get_radarr_client
+from app.core.config import get_user_settings, update_user_settings
+from app.core.metrics import StageTimer, get_registry
 from app.services.sonarr import get_sonarr_client
+from app.services.library_cache import get_library_cache
+from app.services.episode_cache import get_episode_cache
+from app.services.path_mapper import PathMapper
+from app.services.path_validator import check_paths_exist, list_dir
+from app.services.folder_collapse import collapse_episode_files, collapse_listed_files
+from app.services.cache_budget import BudgetItem, get_cache_budget, tag_priority
+from app.services.exclusion_index import get_exclusion_index
+from app.services.exclusion_set import get_exclusion_set
+from app.services.build_jobs import BuildCancelled, BuildJob
 
 logger = logging.getLogger(__name__)
 
+BUILD_STAGE_SECONDS = get_registry().histogram(
+    "exclusion_build_stage_seconds", "Time spent in each exclusion builder stage", ("stage",))
+EPISODE_FETCH_SECONDS = get_registry().histogram(
+    "sonarr_episode_fetch_seconds", "Time to fetch the episode files of one series during a build")
+BUILD_PATHS = get_registry().gauge(
+    "exclusion_build_paths", "Paths considered by the last completed build", ("kind",))
+
 class ExclusionManager:
-    def __init__(self):
-        self.output_file = Path("/config/mover_exclusions.txt")
+    def _fetch_episode_files(self, sonarr, series, workers: int, timeout: int, deadline: float, job: BuildJob) -> dict:
+        """Fetch episode files for many series in parallel, bounded by a worker limit and the build deadline"""
+        results = {}
+        if not series:
+            return results
+        pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="sonarr-fetch")
+        def fetch(series_id):
+            with EPISODE_FETCH_SECONDS.time():
+                return sonarr.get_episode_file_records(series_id, timeout)
 
-    def _apply_path_mappings(self, path: str, source: str = "") -> str:
-        """Apply named service path mapping to rewrite path for exclusion file"""
-        settings = get_user_settings()
-        if source == "radarr":
-            m = settings.exclusions.radarr_mapping
-        elif source == "sonarr":
-            m = settings.exclusions.sonarr_mapping
-        elif source == "plexcache":
-            m = settings.exclusions.plexcache_mapping
-        else:
-            # fallback: try all three in order
-            for m in [settings.exclusions.radarr_mapping, settings.exclusions.sonarr_mapping, settings.exclusions.plexcache_mapping]:
-                if m.from_prefix and path.startswith(m.from_prefix):
-                    return m.to_prefix + path[len(m.from_prefix):]
-            return path
-        if m.from_prefix and path.startswith(m.from_prefix):
-            return m.to_prefix + path[len(m.from_prefix):]
-        return path
-
-    def _to_container_path(self, path: str) -> str:
-        """Translate any path to container-accessible path for existence check"""
-        settings = get_user_settings()
-        host = settings.exclusions.host_cache_path.rstrip('/')  # /mnt/chloe
-        container = settings.exclusions.cache_mount_path.rstrip('/')  # /mnt/cache
-        # Already a full host path (e.g. /mnt/chloe/data/...) -> swap prefix
-        if path.startswith(host + '/') or path == host:
-            return container + path[len(host):]
-        # PlexCache raw path (e.g. /chloe/tv/...) -> /mnt/cache/data/media/tv/...
-        pc_from = settings.exclusions.plexcache_mapping.from_prefix.rstrip('/')  # /chloe
-        pc_to = settings.exclusions.plexcache_mapping.to_prefix  # /mnt/chloe/data/media/
-        if pc_from and path.startswith(pc_from + '/'):
-            mapped = pc_to.rstrip('/') + '/' + path[len(pc_from):].lstrip('/')
-            return container + mapped[len(host):] if mapped.startswith(host) else container + '/' + mapped.lstrip('/')
-        # Path already starts with container mount (e.g. /mnt/cache/...) -> use as-is
-        if path.startswith(container + '/') or path == container:
-            return path
-        # Relative path (e.g. /data/media/movies/...) -> /mnt/cache/data/media/movies/
-        return container + '/' + path.lstrip('/')
-
-    def _exists_on_cache(self, path: str) -> bool:
-        """Check if path exists via container mount"""
-        container_path = self._to_container_path(path)
-        result = os.path.exists(container_path)
-        logger.debug(f"PATH CHECK | container={container_path!r} exists={result}")
-        return result
-
-    def build_exclusions(self):
+        futures = {pool.submit(fetch, s.id): s.id for s in series}
+        try:
+            for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+                results[futures[future]] = future.result()
+                job.advance()
+                if job.cancelled:
+                    break
+        except FuturesTimeout:
+            logger.warning(f"Build deadline reached: episode files for {len(futures) - len(results)} of {len(futures)} series not fetched")
+        finally:
+            # Don't wait on stragglers past the deadline; queued fetches are dropped
+            pool.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def _apply_budget(self, valid_paths, candidates: dict, titles: dict, mapper: PathMapper, exclusions) -> list:
+        """Keep the highest-priority titles that fit under the cache fill limit; custom folders are always kept"""
+        items = {}
+        for p in valid_paths:
+            source = candidates[p]
+            if source in ("radarr", "sonarr") and p in titles:
+                key, title, priority, size = titles[p]
+                item = items.get(key)
+                if item is None:
+                    item = items[key] = BudgetItem(key, source, title, priority)
+                item.add(p, size)
+            elif source == "plexcache":
+                try:
+                    size = os.stat(mapper.to_container(p)).st_size
+                except OSError:
+                    size = 0
+                item = items[f"plexcache:{p}"] = BudgetItem(f"plexcache:{p}", source, p, exclusions.plexcache_priority)
+                item.add(p, size)
+        kept = get_cache_budget().apply(list(items.values()), exclusions.cache_max_fill_percent,
+                                        int(exclusions.cache_reserved_gb * 2**30))
+        if kept is None:
+            return valid_paths
+        kept_paths = {p for item in kept for p in item.paths}
+        return [p for p in valid_paths if p in kept_paths or candidates[p] == ""]
+
+    def _collapse_folders(self, valid_paths, candidates: dict, series_files, mapper: PathMapper, exclusions) -> list:
+        """Replace fully cached Sonarr seasons/series and PlexCache folders by one folder entry each"""
+        valid = set(valid_paths)
+        folders = set()
+        if exclusions.sonarr_collapse_folders:
+            for s, files in series_files:
+                on_cache = {ep.path for ep in files if ep.path in valid and candidates[ep.path] == "sonarr"}
+                if not on_cache:
+                    continue
+                kept = collapse_episode_files(s.path, files, on_cache, exclusions.collapse_min_files)
+                valid -= on_cache
+                valid.update(kept)
+                for p in kept - on_cache:
+                    folders.add(p)
+                    if candidates.get(p) != "radarr":
+                        candidates[p] = "sonarr"
+        if exclusions.plexcache_collapse_folders:
+            listed = {p for p in valid if candidates[p] == "plexcache"}
+            kept = collapse_listed_files(listed, list_dir, mapper.to_container, exclusions.collapse_min_files)
+            valid -= listed
+            valid.update(kept)
+            for p in kept - listed:
+                folders.add(p)
+                candidates.setdefault(p, "plexcache")
+        if folders:
+            # Entries inside a collapsed folder, e.g. PlexCache files of a collapsed series, are now redundant
+            def covered(p):
+                parent = os.path.dirname(p.rstrip('/'))
+                while parent and parent != '/':
+                    if parent in folders:
+                        return True
+                    parent = os.path.dirname(parent)
+                return False
+            valid = {p for p in valid if not covered(p)}
+        return list(valid)
+
+    def build_exclusions(self, job: BuildJob = None):
+        """Build and write the exclusion file; job receives phase progress and is checked for cancellation between phases"""
+        job = job or BuildJob("direct")
+        stages = StageTimer(BUILD_STAGE_SECONDS)
+        started = time.time()
         logger.info("Building exclusions list...")
         settings = get_user_settings()
+        deadline = time.monotonic() + settings.exclusions.build_timeout
         all_paths = set()
 
         # 1. Custom folders - use as-is
@@ -69,6 +128,8 @@ class ExclusionManager:
                 all_paths.add(folder.strip())
 
         # 2. PlexCache-D paths
+        job.set_phase("plexcache")
+        stages.start("plexcache_read")
         plexcache_paths = set()
         pc_path = Path(settings.exclusions.plexcache_file_path)
         if pc_path.exists():
@@ -82,94 +143,187 @@ class ExclusionManager:
             except Exception as e:
                 logger.error(f"Error reading PlexCache file: {e}")
         all_paths.update(plexcache_paths)
+        job.check_cancelled()
 
         # 3. Radarr - use full file path if downloaded, else folder
+        job.set_phase("radarr")
+        stages.start("radarr_fetch")
         radarr_paths = set()
+        # Path -> (title key, title, priority, bytes) of tagged titles, for the cache budget
+        titles = {}
         if settings.exclusions.radarr_exclude_tag_ids:
             try:
-                movies = get_radarr_client().get_all_movies()
+                # Builds always fetch fresh data and publish it for the pages to reuse
+                movies = get_library_cache().refresh("radarr_movies")
                 tag_ids = set(settings.exclusions.radarr_exclude_tag_ids)
+                priorities = settings.exclusions.radarr_tag_priorities
                 for m in movies:
-                    if any(t in tag_ids for t in m.get('tags', [])):
-                        file_path = m.get('movieFile', {}).get('path')
-                        folder_path = m.get('path')
-                        path = (file_path or folder_path or '').strip()
+                    if not tag_ids.isdisjoint(m.tags):
+                        path = m.file_path or m.path
                         if path:
                             radarr_paths.add(path)
+                            titles[path] = (f"radarr:{m.id}", m.title, tag_priority(m.tags, tag_ids, priorities), m.size_on_disk)
             except Exception as e:
                 logger.error(f"Radarr exclusion build failed: {e}")
+        job.check_cancelled()
 
-        # 4. Sonarr - individual episode files
+        # 4. Sonarr - individual episode files, fetched in parallel per series
+        job.set_phase("sonarr")
+        stages.start("sonarr_series_fetch")
         sonarr_paths = set()
+        series_files = []
         if settings.exclusions.sonarr_exclude_tag_ids:
             try:
                 sonarr = get_sonarr_client()
-                shows = sonarr.get_all_series()
+                shows = get_library_cache().refresh("sonarr_series")
                 tag_ids = set(settings.exclusions.sonarr_exclude_tag_ids)
-                for s in shows:
-                    if any(t in tag_ids for t in s.get('tags', [])):
-                        episode_files = sonarr.get_episode_files(s['id'])
-                        if episode_files:
-                            for ep in episode_files:
-                                ep_path = (ep.get('path') or '').strip()
-                                if ep_path:
-                                    sonarr_paths.add(ep_path)
-                        elif s.get('path'):
-                            sonarr_paths.add(s['path'].strip())
+                tagged = [s for s in shows if not tag_ids.isdisjoint(s.tags)]
+
+                # Only series whose fingerprint changed since the last build are refetched
+                episode_cache = get_episode_cache()
+                cached = {}
+                if settings.exclusions.episode_cache_enabled:
+                    for s in tagged:
+                        files = episode_cache.get(s, settings.exclusions.episode_cache_max_age)
+                        if files is not None:
+                            cached[s.id] = files
+                job.set_phase("sonarr", total=len(tagged))
+                stages.start("sonarr_episode_fetch")
+                job.advance(len(cached))
+                fetched = self._fetch_episode_files(
+                    sonarr, [s for s in tagged if s.id not in cached],
+                    workers=settings.exclusions.sonarr_fetch_workers,
+                    timeout=settings.exclusions.sonarr_request_timeout,
+                    deadline=deadline,
+                    job=job,
+                )
+                # A cancelled build must not cache or publish a partial fetch
+                job.check_cancelled()
+                if settings.exclusions.episode_cache_enabled:
+                    for s in tagged:
+                        # Empty results can't be told apart from failed fetches, so they are never cached
+                        if fetched.get(s.id):
+                            episode_cache.put(s, fetched[s.id])
+                    if shows:
+                        episode_cache.prune(s.id for s in shows)
+                    episode_cache.save()
+                logger.info(f"Sonarr episode files: {len(cached)} series from cache, {len(fetched)} fetched")
+
+                priorities = settings.exclusions.sonarr_tag_priorities
+                for s in tagged:
+                    episode_files = cached.get(s.id) or fetched.get(s.id)
+                    title = (f"sonarr:{s.id}", s.title, tag_priority(s.tags, tag_ids, priorities))
+                    if episode_files:
+                        sonarr_paths.update(ep.path for ep in episode_files if ep.path)
+                        series_files.append((s, episode_files))
+                        for ep in episode_files:
+                            if ep.path:
+                                titles[ep.path] = (*title, ep.size)
+                    elif s.path:
+                        sonarr_paths.add(s.path)
+                        titles[s.path] = (*title, s.size_on_disk or 0)
+            except BuildCancelled:
+                raise
             except Exception as e:
                 logger.error(f"Sonarr exclusion build failed: {e}")
+        stages.stop()
+        job.check_cancelled()
+
+        # Each path carries its source; where sources overlap Radarr wins, then Sonarr, then PlexCache
+        candidates = dict.fromkeys(all_paths, "")
+        candidates.update(dict.fromkeys(plexcache_paths, "plexcache"))
+        candidates.update(dict.fromkeys(sonarr_paths, "sonarr"))
+        candidates.update(dict.fromkeys(radarr_paths, "radarr"))
 
-        all_paths.update(radarr_paths)
-        all_paths.update(sonarr_paths)
-
-        # 5. Map paths then validate existence then write.
-        # PlexCache raw paths (e.g. /chloe/tv/...) must be mapped to host paths
-        # before existence check since raw prefix has no container mount.
-        def map_path(p):
-            if p in radarr_paths: return self._apply_path_mappings(p, "radarr")
-            if p in sonarr_paths: return self._apply_path_mappings(p, "sonarr")
-            if p in plexcache_paths: return self._apply_path_mappings(p, "plexcache")
-            return self._apply_path_mappings(p)
-
-        valid_paths = []
-        skipped = 0
-        for p in all_paths:
-            # PlexCache paths are already guaranteed on cache - skip existence check
-            if p in plexcache_paths:
-                valid_paths.append(p)
-                continue
-            if self._exists_on_cache(p):
-                valid_paths.append(p)
-            else:
-                skipped += 1
+        # 5. Validate existence, then map paths and write.
+        # PlexCache raw paths (e.g. /chloe/tv/...) are translated with the PlexCache
+        # mapping for the existence check since the raw prefix has no container mount.
+        job.set_phase("validate", total=len(candidates))
+        stages.start("existence_check")
+        mapper = PathMapper(settings.exclusions)
+        # PlexCache paths are already guaranteed on cache - skip existence check
+        container_paths = {p: mapper.to_container(p) for p in candidates if p not in plexcache_paths}
+        existing, check_stats = check_paths_exist(
+            set(container_paths.values()), workers=settings.exclusions.existence_check_workers
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            for container_path in sorted(container_paths.values()):
+                logger.debug(f"PATH CHECK | container={container_path!r} exists={container_path in existing}")
+        logger.info(
+            f"Existence check: {check_stats['candidates']} paths in {check_stats['directories']} directories, "
+            f"{check_stats['syscalls_saved']} syscalls saved, {check_stats['seconds']}s"
+        )
 
+        job.advance(len(candidates))
+        job.check_cancelled()
+
+        valid_paths = [p for p in candidates if p in plexcache_paths or container_paths[p] in existing]
+        skipped = len(candidates) - len(valid_paths)
+        dropped = 0
+        if settings.exclusions.cache_budget_enabled:
+            # Before collapsing, so a season missing a dropped episode isn't written as a folder
+            stages.start("budget")
+            on_cache = len(valid_paths)
+            valid_paths = self._apply_budget(valid_paths, candidates, titles, mapper, settings.exclusions)
+            dropped = on_cache - len(valid_paths)
+        collapsed = 0
+        if settings.exclusions.sonarr_collapse_folders or settings.exclusions.plexcache_collapse_folders:
+            stages.start("collapse")
+            on_cache = len(valid_paths)
+            valid_paths = self._collapse_folders(valid_paths, candidates, series_files, mapper, settings.exclusions)
+            collapsed = on_cache - len(valid_paths)
+            logger.info(f"Folder collapsing: {on_cache} paths on cache written as {len(valid_paths)} entries")
+
+        stages.start("mapping")
         final_list = sorted(valid_paths)
-        mapped_paths = [map_path(p) for p in final_list]
+        rewritten = mapper.rewrite_all((p, candidates[p]) for p in final_list)
+        mapped_paths = [mapped for _, _, mapped in rewritten]
 
+        job.set_phase("write", total=len(mapped_paths))
+        stages.start("write")
         try:
-            with open(self.output_file, 'w') as f:
-                for path in mapped_paths:
-                    f.write(f"{path}\n")
+            # Webhook updates that arrived while this build ran are replayed over its result
+            write_result = get_exclusion_set().replace({mapped: source for _, source, mapped in rewritten}, since=started)
+            stages.stop()
+            job.advance(len(mapped_paths))
 
-            settings.exclusions.last_build = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            save_user_settings(settings)
+            # Settings may have been edited during the build, so only the timestamp is written back
+            def stamp(latest):
+                latest.exclusions.last_build = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            update_user_settings(stamp)
 
-            logger.info(f"Exclusions built. Candidates: {len(all_paths)}, On cache: {len(final_list)}, Skipped: {skipped}")
-            return {"total": len(final_list), "candidates": len(all_paths), "skipped": skipped}
+            logger.info(f"Exclusions built. Candidates: {len(candidates)}, On cache: {len(final_list)}, Skipped: {skipped}")
+            BUILD_PATHS.set(len(candidates), kind="candidates")
+            BUILD_PATHS.set(len(final_list), kind="on_cache")
+            BUILD_PATHS.set(skipped, kind="skipped")
+            BUILD_PATHS.set(collapsed, kind="collapsed")
+            BUILD_PATHS.set(dropped, kind="over_budget")
+            return {
+                "total": len(final_list),
+                "candidates": len(candidates),
+                "skipped": skipped,
+                "collapsed": collapsed,
+                "over_budget": dropped,
+                "syscalls_saved": check_stats["syscalls_saved"],
+                "validation_seconds": check_stats["seconds"],
+                "changed": write_result["changed"],
+                "added": write_result["added"],
+                "removed": write_result["removed"],
+            }
 
         except Exception as e:
             logger.error(f"Failed to write exclusion file: {e}")
             raise e
 
     def get_exclusion_stats(self):
-        if not self.output_file.exists(): return {"total_count": 0}
-        with open(self.output_file, 'r') as f:
-            return {"total_count": len([l for l in f if l.strip()])}
+        return {"total_count": get_exclusion_index().count()}
 
     def get_all_exclusions(self):
-        if not self.output_file.exists(): return []
-        with open(self.output_file, 'r') as f:
-            return [line.strip() for line in f if line.strip()]
+        return get_exclusion_index().lines()
+
+    def search_exclusions(self, q: str = "", offset: int = 0, limit: int = 100):
+        total, items = get_exclusion_index().search(q, offset, limit)
+        return {"total": total, "offset": offset, "limit": limit, "items": items}
 
 def get_exclusion_manager():
     return ExclusionManager()
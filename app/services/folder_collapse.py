@@ -0,0 +1,79 @@
+"""
+Collapse fully cached seasons, series and folders into one folder entry.
+
+CA Mover matches every file it considers against each exclusion line, so a
+folder line that covers the same files as hundreds of episode lines makes the
+list shorter and Mover's filtering faster. A folder is only emitted when every
+file it is known to hold is already excluded, so coverage is unchanged.
+"""
+import posixpath
+from collections import defaultdict
+from typing import Callable, Iterable, List, Optional, Set
+
+from app.services.media import EpisodeFile
+
+
+def _under(path: str, root: str) -> bool:
+    return path.startswith(root + '/')
+
+
+def collapse_episode_files(series_path: str, files: List[EpisodeFile], on_cache: Set[str], min_files: int) -> Set[str]:
+    """Paths to exclude for one series, given which of its episode files are on cache.
+
+    The series folder replaces all its files when every one of them is on
+    cache; otherwise each season whose files are all on cache, in a folder of
+    their own, is replaced by that folder. Groups of fewer than min_files
+    files are left as they are.
+    """
+    root = series_path.rstrip('/')
+    by_season = defaultdict(list)
+    for ep in files:
+        if ep.path:
+            by_season[ep.season_number].append(ep.path)
+    paths = [p for season in by_season.values() for p in season]
+
+    if root and len(paths) >= max(1, min_files) and all(p in on_cache and _under(p, root) for p in paths):
+        return {root}
+
+    # A folder shared by two seasons would cover the other season's files too
+    seasons_in_folder = defaultdict(set)
+    for season, season_paths in by_season.items():
+        for p in season_paths:
+            seasons_in_folder[posixpath.dirname(p)].add(season)
+
+    kept = set()
+    for season, season_paths in by_season.items():
+        folders = {posixpath.dirname(p) for p in season_paths}
+        folder = folders.pop() if len(folders) == 1 else None
+        if (folder and folder != root and len(seasons_in_folder[folder]) == 1
+                and len(season_paths) >= max(1, min_files)
+                and all(p in on_cache for p in season_paths)):
+            kept.add(folder)
+        else:
+            kept.update(p for p in season_paths if p in on_cache)
+    return kept
+
+
+def collapse_listed_files(paths: Iterable[str], list_dir: Callable[[str], Optional[Set[str]]],
+                          to_container: Callable[[str], str], min_files: int) -> Set[str]:
+    """Replace files by their folder where the folder on cache holds nothing but those files.
+
+    For sources such as PlexCache that list files without saying which
+    season they belong to, the folder's cache listing stands in for the
+    season. list_dir returns the names in a container folder, or None when
+    it can't be listed, in which case the files are kept.
+    """
+    by_folder = defaultdict(dict)
+    for p in paths:
+        folder, name = posixpath.split(p.rstrip('/'))
+        by_folder[folder][name] = p
+
+    kept = set()
+    for folder, names in by_folder.items():
+        if folder and len(names) >= max(1, min_files):
+            listing = list_dir(to_container(folder))
+            if listing and listing <= names.keys():
+                kept.add(folder)
+                continue
+        kept.update(names.values())
+    return kept
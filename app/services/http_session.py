@@ -0,0 +1,179 @@
+"""
+Pooled keep-alive HTTP sessions for the Radarr and Sonarr clients.
+
+Blocking requests sessions serve the scheduler jobs; httpx async clients
+serve the FastAPI routes so a slow upstream never stalls the event loop.
+"""
+import asyncio
+import re
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core.config import HttpSettings
+from app.core.metrics import get_registry
+from app.services.json_stream import JsonArrayParser, iter_json_array
+
+RETRY_STATUSES = (500, 502, 503, 504)
+# Read size for streamed library responses
+CHUNK_SIZE = 64 * 1024
+
+UPSTREAM_REQUESTS = get_registry().counter(
+    "upstream_requests_total", "Requests to Radarr/Sonarr by response status", ("service", "method", "endpoint", "status"))
+UPSTREAM_SECONDS = get_registry().histogram(
+    "upstream_request_seconds", "Radarr/Sonarr request latency (to headers for streamed responses)", ("service", "method", "endpoint"))
+UPSTREAM_BYTES = get_registry().counter(
+    "upstream_response_bytes_total", "Decoded response body bytes received from Radarr/Sonarr", ("service", "endpoint"))
+UPSTREAM_ERRORS = get_registry().counter(
+    "upstream_errors_total", "Radarr/Sonarr requests that failed without a response", ("service", "endpoint", "error"))
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+# Service label of each async client; httpx clients have no room for it themselves
+_async_services = weakref.WeakKeyDictionary()
+
+
+def endpoint_label(url: str) -> str:
+    """API path of a request with ids collapsed, e.g. /api/v3/movie/12 -> /api/v3/movie/:id"""
+    path = urlsplit(str(url)).path
+    api = path.find("/api/")
+    return _ID_SEGMENT.sub("/:id", path[api:] if api >= 0 else path) or "/"
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter that records request counts, latency, body bytes and errors per service and endpoint"""
+    def __init__(self, service: str = "", **kwargs):
+        self.service = service
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        endpoint = endpoint_label(request.url)
+        start = time.perf_counter()
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(service=self.service, endpoint=endpoint, error=type(e).__name__)
+            raise
+        if not stream:
+            UPSTREAM_BYTES.inc(len(response.content), service=self.service, endpoint=endpoint)
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, service=self.service, method=request.method, endpoint=endpoint)
+        UPSTREAM_REQUESTS.inc(service=self.service, method=request.method, endpoint=endpoint, status=response.status_code)
+        return response
+
+
+def build_session(url: str, api_key: str, http: HttpSettings, service: str = "", pool_size: int = 0) -> requests.Session:
+    """Session with a connection pool, gzip and retry with backoff on 5xx and connection errors.
+
+    pool_size, if larger than http.pool_size, raises the pool so that many threads can share the session.
+    """
+    session = requests.Session()
+    session.headers.update({
+        'X-Api-Key': api_key,
+        'Accept': 'application/json',
+        'Accept-Encoding': 'gzip, deflate',
+    })
+    retry = Retry(
+        total=http.max_retries,
+        backoff_factor=http.backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "PUT"}),
+        # Hand the last 5xx back to the caller so raise_for_status() reports it
+        raise_on_status=False,
+    )
+    adapter = InstrumentedAdapter(service, pool_connections=1, pool_maxsize=max(1, http.pool_size, pool_size), max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if url:
+        # Connection tests must fail fast, so the status endpoint never retries
+        session.mount(f"{url}/api/v3/system/status", InstrumentedAdapter(service, pool_connections=1, pool_maxsize=1, max_retries=0))
+    return session
+
+
+def client_key(url: str, api_key: str, http: HttpSettings, pool_size: int = 0) -> tuple:
+    """Everything a pooled session depends on; a change means the client must be rebuilt"""
+    return (url, api_key, max(http.pool_size, pool_size), http.max_retries, http.backoff_factor)
+
+
+def build_async_client(api_key: str, http: HttpSettings, service: str = "") -> httpx.AsyncClient:
+    """Async counterpart of build_session; retries and metrics are applied by request_with_retry"""
+    client = httpx.AsyncClient(
+        headers={
+            'X-Api-Key': api_key,
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        },
+        limits=httpx.Limits(max_connections=max(1, http.pool_size), max_keepalive_connections=max(1, http.pool_size)),
+    )
+    _async_services[client] = service
+    return client
+
+
+async def request_with_retry(client: httpx.AsyncClient, method: str, url: str, http: HttpSettings,
+                             retry: bool = True, stream: bool = False, **kwargs) -> httpx.Response:
+    """Send a request, retrying 5xx responses and connection errors with exponential backoff.
+
+    With stream=True the body is left unread and the caller must close the response.
+    """
+    attempts = http.max_retries + 1 if retry else 1
+    service, endpoint = _async_services.get(client, ""), endpoint_label(url)
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        start = time.perf_counter()
+        try:
+            response = await client.send(client.build_request(method, url, **kwargs), stream=stream)
+        except httpx.TransportError as e:
+            UPSTREAM_ERRORS.inc(service=service, endpoint=endpoint, error=type(e).__name__)
+            if last: raise
+        else:
+            if not stream:
+                UPSTREAM_BYTES.inc(len(response.content), service=service, endpoint=endpoint)
+            UPSTREAM_SECONDS.observe(time.perf_counter() - start, service=service, method=method, endpoint=endpoint)
+            UPSTREAM_REQUESTS.inc(service=service, method=method, endpoint=endpoint, status=response.status_code)
+            if response.status_code not in RETRY_STATUSES or last:
+                return response
+            await response.aclose()
+        await asyncio.sleep(http.backoff_factor * (2 ** attempt))
+
+
+def stream_json_list(session: requests.Session, url: str, fields=None, factory=None, **kwargs) -> list:
+    """GET a JSON array, parsing it incrementally and keeping only the requested fields.
+
+    factory, if given, converts each element as soon as it is parsed (e.g. Movie.from_api).
+    """
+    with session.get(url, stream=True, **kwargs) as response:
+        response.raise_for_status()
+        received = [0]
+
+        def chunks():
+            for chunk in response.iter_content(CHUNK_SIZE):
+                received[0] += len(chunk)
+                yield chunk
+        try:
+            items = iter_json_array(chunks(), fields)
+            return list(map(factory, items) if factory else items)
+        finally:
+            UPSTREAM_BYTES.inc(received[0], service=getattr(response.connection, "service", ""), endpoint=endpoint_label(url))
+
+
+async def astream_json_list(client: httpx.AsyncClient, url: str, http: HttpSettings, fields=None, factory=None, **kwargs) -> list:
+    """Async counterpart of stream_json_list"""
+    response = await request_with_retry(client, "GET", url, http, stream=True, **kwargs)
+    received = 0
+    try:
+        response.raise_for_status()
+        parser = JsonArrayParser(fields)
+        items = []
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            received += len(chunk)
+            parsed = parser.feed(chunk)
+            items.extend(map(factory, parsed) if factory else parsed)
+        parsed = parser.close()
+        items.extend(map(factory, parsed) if factory else parsed)
+        return items
+    finally:
+        UPSTREAM_BYTES.inc(received, service=_async_services.get(client, ""), endpoint=endpoint_label(url))
+        await response.aclose()
@@ -0,0 +1,127 @@
+"""
+Incremental, field-projected parsing of large JSON array responses
+"""
+import codecs
+import json
+import re
+from typing import Iterable, Iterator, Optional, Sequence
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# A bare number, true, false or null runs until whitespace, ',' or ']'
+_SCALAR = re.compile(r'[^ \t\n\r,\]]*')
+
+
+def compile_fields(fields: Sequence[str]) -> dict:
+    """Turn dotted field names ('movieFile.path') into a nested projection tree"""
+    tree = {}
+    for field in fields:
+        node = tree
+        parts = field.split('.')
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:
+                # The whole parent was already requested
+                break
+            node = child
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def project(item, tree: dict):
+    """Keep only the fields in tree; missing fields are left out rather than set to None"""
+    out = {}
+    for key, sub in tree.items():
+        if key not in item:
+            continue
+        value = item[key]
+        if sub is None:
+            out[key] = value
+        elif isinstance(value, dict):
+            out[key] = project(value, sub)
+        elif isinstance(value, list):
+            out[key] = [project(v, sub) if isinstance(v, dict) else v for v in value]
+    return out
+
+
+class JsonArrayParser:
+    """Parses a top-level JSON array fed in arbitrary byte chunks, one element at a time.
+
+    Only the element being decoded and the unconsumed tail of the input are
+    held in memory, and each element is projected down to the requested
+    fields as soon as it is complete.
+    """
+    def __init__(self, fields: Optional[Sequence[str]] = None):
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._tree = compile_fields(fields) if fields else None
+        self._buf = ""
+        self._state = "start"
+
+    def feed(self, chunk: bytes) -> list:
+        self._buf += self._text.decode(chunk)
+        return self._drain(final=False)
+
+    def close(self) -> list:
+        self._buf += self._text.decode(b"", final=True)
+        items = self._drain(final=True)
+        if self._state != "done":
+            raise ValueError("Truncated JSON array in response")
+        return items
+
+    def _drain(self, final: bool) -> list:
+        items = []
+        buf, pos, n = self._buf, 0, len(self._buf)
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos >= n or self._state == "done":
+                break
+            char = buf[pos]
+            if self._state == "start":
+                if char != '[':
+                    raise ValueError("Expected a JSON array in response")
+                pos += 1
+                self._state = "first"
+            elif self._state == "separator":
+                if char == ',':
+                    pos += 1
+                    self._state = "value"
+                elif char == ']':
+                    pos += 1
+                    self._state = "done"
+                else:
+                    raise ValueError(f"Unexpected {char!r} between array elements")
+            elif self._state == "first" and char == ']':
+                pos += 1
+                self._state = "done"
+            else:
+                if char in '{["':
+                    try:
+                        value, pos = self._decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        if final:
+                            raise
+                        # Element continues in the next chunk
+                        break
+                else:
+                    # A scalar's end isn't known until its delimiter arrives ('[12' may go on as '[1234]')
+                    end = _SCALAR.match(buf, pos).end()
+                    if end >= n and not final:
+                        break
+                    value, next_pos = self._decoder.raw_decode(buf[:end], pos)
+                    if next_pos != end:
+                        raise ValueError(f"Invalid array element {buf[pos:end]!r} in response")
+                    pos = end
+                if self._tree is not None and isinstance(value, dict):
+                    value = project(value, self._tree)
+                items.append(value)
+                self._state = "separator"
+        self._buf = buf[pos:]
+        return items
+
+
+def iter_json_array(chunks: Iterable[bytes], fields: Optional[Sequence[str]] = None) -> Iterator:
+    parser = JsonArrayParser(fields)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
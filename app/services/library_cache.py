@@ -0,0 +1,153 @@
+"""
+Shared in-process snapshots of the Radarr and Sonarr libraries and tag tables
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from app.core.config import get_user_settings
+from app.services.media import TagTable
+
+logger = logging.getLogger(__name__)
+
+
+def _tag_table(tags):
+    return None if tags is None else TagTable(tags)
+
+
+def _fetch(key):
+    from app.services.radarr import get_radarr_client
+    from app.services.sonarr import get_sonarr_client
+    if key == "radarr_movies": return get_radarr_client().get_movie_records()
+    if key == "radarr_tags": return _tag_table(get_radarr_client().get_all_tags())
+    if key == "sonarr_series": return get_sonarr_client().get_series_records()
+    if key == "sonarr_tags": return _tag_table(get_sonarr_client().get_all_tags())
+    raise KeyError(key)
+
+
+async def _afetch(key):
+    from app.services.radarr import get_async_radarr_client
+    from app.services.sonarr import get_async_sonarr_client
+    if key == "radarr_movies": return await get_async_radarr_client().get_movie_records()
+    if key == "radarr_tags": return _tag_table(await get_async_radarr_client().get_all_tags())
+    if key == "sonarr_series": return await get_async_sonarr_client().get_series_records()
+    if key == "sonarr_tags": return _tag_table(await get_async_sonarr_client().get_all_tags())
+    raise KeyError(key)
+
+
+class Snapshot:
+    __slots__ = ("data", "fetched_at")
+
+    def __init__(self, data):
+        self.data = data
+        self.fetched_at = time.monotonic()
+
+
+class LibraryCache:
+    """Serves library data (lists of Movie/Series records and TagTables) from memory with a TTL and stale-while-revalidate.
+
+    Fresh snapshots are returned as-is. Snapshots past the TTL but inside the
+    stale window are returned immediately while a background thread refetches
+    them. Anything older, or explicitly invalidated, is fetched inline. The
+    clients return None when a fetch fails: that raises here and keeps the
+    previous snapshot, while an empty library or tag list is cached like any
+    other result.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshots = {}
+        self.refreshing = set()
+        self.fetch_locks = {}
+        self.async_locks = {}
+
+    def _lookup(self, key):
+        """Usable snapshot for key, scheduling a background refresh if it is stale"""
+        settings = get_user_settings().exclusions
+        with self.lock:
+            snap = self.snapshots.get(key)
+            if snap is None:
+                return None
+            age = time.monotonic() - snap.fetched_at
+            if age < settings.library_cache_ttl:
+                return snap
+            if age >= settings.library_cache_ttl + settings.library_cache_stale_ttl:
+                return None
+            if key in self.refreshing:
+                return snap
+            self.refreshing.add(key)
+        threading.Thread(target=self._background_refresh, args=(key,), daemon=True, name=f"library-refresh-{key}").start()
+        return snap
+
+    def _background_refresh(self, key):
+        try:
+            self.refresh(key)
+        except Exception as e:
+            logger.error(f"Library refresh failed for {key}: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def put(self, key, data):
+        if data is None:
+            raise RuntimeError(f"{key} could not be fetched")
+        with self.lock:
+            self.snapshots[key] = Snapshot(data)
+        return data
+
+    def get(self, key):
+        """Blocking read for scheduler jobs and threadpool code"""
+        snap = self._lookup(key)
+        if snap is not None:
+            return snap.data
+        with self.lock:
+            fetch_lock = self.fetch_locks.setdefault(key, threading.Lock())
+        # Single-flight: concurrent misses wait for one fetch instead of each hitting the service
+        with fetch_lock:
+            snap = self._lookup(key)
+            if snap is not None:
+                return snap.data
+            return self.put(key, _fetch(key))
+
+    async def aget(self, key):
+        """Non-blocking read for the FastAPI routes"""
+        snap = self._lookup(key)
+        if snap is not None:
+            return snap.data
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            owner, fetch_lock = self.async_locks.get(key, (None, None))
+            if owner is not loop:
+                fetch_lock = asyncio.Lock()
+                self.async_locks[key] = (loop, fetch_lock)
+        async with fetch_lock:
+            snap = self._lookup(key)
+            if snap is not None:
+                return snap.data
+            return self.put(key, await _afetch(key))
+
+    def refresh(self, key):
+        """Fetch key now and replace its snapshot; a failed fetch raises and keeps the old one"""
+        return self.put(key, _fetch(key))
+
+    def refresh_all(self):
+        """Refetch every snapshot that has been requested so far (scheduler job)"""
+        with self.lock:
+            keys = list(self.snapshots)
+        for key in keys:
+            try:
+                self.refresh(key)
+            except Exception as e:
+                logger.error(f"Library refresh failed for {key}: {e}")
+
+    def invalidate(self, prefix=""):
+        """Drop snapshots whose key starts with prefix, e.g. 'radarr' or 'sonarr_series'"""
+        with self.lock:
+            for key in [k for k in self.snapshots if k.startswith(prefix)]:
+                del self.snapshots[key]
+
+# Singleton instance
+_library_cache = LibraryCache()
+
+def get_library_cache():
+    return _library_cache
@@ -0,0 +1,133 @@
+"""
+Prebuilt search/sort/tag indexes over cached library snapshots, for the paginated JSON endpoints
+"""
+import bisect
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Sequence
+
+from app.services.media import TagTable
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-folded word tokens, so 'Amélie' matches a search for 'amelie'"""
+    folded = unicodedata.normalize("NFKD", text or "")
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return _TOKEN.findall(folded.casefold())
+
+
+class LibraryIndex:
+    """Read-only index over one snapshot of Movie or Series records.
+
+    Built once per snapshot: positions sorted by each sort key in both
+    directions, tag ID to positions, and a sorted title-token vocabulary for
+    prefix search. Queries only touch the matching positions and the
+    requested page.
+    """
+    def __init__(self, records: Sequence, tag_table: TagTable, sort_keys: Dict[str, callable]):
+        self.records = records
+        self.tag_table = tag_table
+        n = len(records)
+
+        title = lambda i: (records[i].title or "").casefold()
+        by_title = sorted(range(n), key=title)
+        # Keyed by (sort, descending)
+        self.orders = {("title", False): by_title, ("title", True): sorted(range(n), key=title, reverse=True)}
+        for name, key in sort_keys.items():
+            # Stable sort on top of the title order keeps ties alphabetical either way; missing values sort last
+            self.orders[name, False] = sorted(by_title, key=lambda i: (key(records[i]) is None, key(records[i]) or 0))
+            self.orders[name, True] = sorted(by_title, key=lambda i: (key(records[i]) is None, -(key(records[i]) or 0)))
+        self.ranks = {name: _ranks(order) for name, order in self.orders.items()}
+
+        self.by_tag: Dict[int, set] = {}
+        self.untagged = set()
+        postings: Dict[str, set] = {}
+        for i, record in enumerate(records):
+            if record.tags:
+                for tag_id in record.tags:
+                    self.by_tag.setdefault(tag_id, set()).add(i)
+            else:
+                self.untagged.add(i)
+            for token in tokenize(record.title):
+                postings.setdefault(token, set()).add(i)
+        self.vocabulary = sorted(postings)
+        self.postings = postings
+
+    def tags(self) -> List[dict]:
+        """Tags actually used in the library, for the filter panel"""
+        tags = [{"id": t, "label": self.tag_table.labels.get(t, f"Unknown Tag {t}"), "count": len(ids)}
+                for t, ids in self.by_tag.items()]
+        return sorted(tags, key=lambda t: t["label"].casefold())
+
+    def _prefix_matches(self, token: str) -> set:
+        """Union of postings for every title token starting with token"""
+        matches = set()
+        start = bisect.bisect_left(self.vocabulary, token)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(token):
+                break
+            matches |= self.postings[word]
+        return matches
+
+    def search(self, q: str = "", tag_ids: Sequence[int] = (), untagged: bool = False,
+               sort: str = "title", descending: bool = False, offset: int = 0, limit: int = 100):
+        """(total matches, records on the requested page)"""
+        if (sort, descending) not in self.orders:
+            sort = "title"
+        order = self.orders[sort, descending]
+        candidates: Optional[set] = None
+
+        filters = [self.by_tag.get(t, set()) for t in tag_ids]
+        if untagged:
+            filters.append(self.untagged)
+        # Every query word must prefix-match some word of the title
+        filters.extend(self._prefix_matches(token) for token in tokenize(q))
+
+        for ids in sorted(filters, key=len):
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                break
+
+        if candidates is None:
+            total = len(order)
+            page = order[offset:offset + limit]
+        else:
+            total = len(candidates)
+            page = sorted(candidates, key=self.ranks[sort, descending].__getitem__)[offset:offset + limit]
+        return total, [self.records[i] for i in page]
+
+
+def _ranks(order: List[int]) -> List[int]:
+    ranks = [0] * len(order)
+    for rank, i in enumerate(order):
+        ranks[i] = rank
+    return ranks
+
+
+# Extra sort keys per dataset, on top of title
+SORT_KEYS = {
+    "radarr": {"year": lambda m: m.year},
+    "sonarr": {"year": lambda s: s.year, "seasons": lambda s: s.season_count},
+}
+
+_indexes: Dict[str, LibraryIndex] = {}
+_lock = threading.Lock()
+
+
+def get_library_index(source: str, records: Sequence, tag_table: TagTable) -> LibraryIndex:
+    """Index for the given snapshot of a source ('radarr' or 'sonarr'), rebuilt only when the records snapshot changes.
+
+    Tag labels are only read at query time, so a new tag table is swapped
+    into the existing index instead of rebuilding it.
+    """
+    with _lock:
+        index = _indexes.get(source)
+        if index is None or index.records is not records:
+            index = LibraryIndex(records, tag_table, SORT_KEYS[source])
+            _indexes[source] = index
+        elif index.tag_table is not tag_table:
+            index.tag_table = tag_table
+        return index
@@ -0,0 +1,123 @@
+"""
+Compact records for Radarr movies, Sonarr series and episode files.
+
+Library responses are turned into these as they stream in, so a large
+library costs one small slotted object per title instead of a dict tree.
+Tag ID tuples are interned, so titles that share a tag set share one tuple.
+"""
+import sys
+from typing import Dict, Iterable, Tuple
+
+_tag_tuples: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+
+def intern_tags(tag_ids) -> Tuple[int, ...]:
+    key = tuple(tag_ids or ())
+    return _tag_tuples.setdefault(key, key)
+
+
+class TagTable:
+    """Tag ID -> label lookup; labels are resolved once per distinct tag set, not once per title"""
+    __slots__ = ("tags", "labels", "_resolved")
+
+    def __init__(self, tags: Iterable[dict]):
+        self.tags = list(tags)
+        self.labels = {t['id']: sys.intern(t['label']) for t in self.tags}
+        self._resolved: Dict[Tuple[int, ...], Tuple[str, ...]] = {}
+
+    def __len__(self):
+        return len(self.tags)
+
+    def labels_for(self, tag_ids: Tuple[int, ...]) -> Tuple[str, ...]:
+        labels = self._resolved.get(tag_ids)
+        if labels is None:
+            labels = tuple(self.labels.get(t, f"Unknown Tag {t}") for t in tag_ids)
+            self._resolved[tag_ids] = labels
+        return labels
+
+
+class Movie:
+    FIELDS = ("id", "title", "year", "tags", "path", "movieFile.path", "sizeOnDisk")
+    __slots__ = ("id", "title", "year", "tags", "path", "file_path", "size_on_disk")
+
+    def __init__(self, id, title, year, tags, path, file_path, size_on_disk=0):
+        self.id = id
+        self.title = title
+        self.year = year
+        self.tags = tags
+        self.path = path
+        self.file_path = file_path
+        self.size_on_disk = size_on_disk
+
+    @classmethod
+    def from_api(cls, item: dict) -> "Movie":
+        return cls(
+            item['id'],
+            item.get('title', ''),
+            item.get('year'),
+            intern_tags(item.get('tags')),
+            (item.get('path') or '').strip(),
+            ((item.get('movieFile') or {}).get('path') or '').strip(),
+            item.get('sizeOnDisk') or 0,
+        )
+
+
+class Series:
+    FIELDS = (
+        "id", "title", "year", "seasonCount", "tags", "path", "lastAired", "previousAiring",
+        "statistics.episodeFileCount", "statistics.sizeOnDisk",
+    )
+    __slots__ = ("id", "title", "year", "season_count", "tags", "path",
+                 "episode_file_count", "size_on_disk", "last_aired")
+
+    def __init__(self, id, title, year, season_count, tags, path, episode_file_count, size_on_disk, last_aired):
+        self.id = id
+        self.title = title
+        self.year = year
+        self.season_count = season_count
+        self.tags = tags
+        self.path = path
+        self.episode_file_count = episode_file_count
+        self.size_on_disk = size_on_disk
+        self.last_aired = last_aired
+
+    @classmethod
+    def from_api(cls, item: dict) -> "Series":
+        stats = item.get('statistics') or {}
+        return cls(
+            item['id'],
+            item.get('title', ''),
+            item.get('year'),
+            item.get('seasonCount', 0),
+            intern_tags(item.get('tags')),
+            (item.get('path') or '').strip(),
+            stats.get('episodeFileCount'),
+            stats.get('sizeOnDisk'),
+            item.get('lastAired') or item.get('previousAiring'),
+        )
+
+    @property
+    def fingerprint(self) -> str:
+        """Summary that changes whenever the series' files do"""
+        return f"{self.path}|{self.episode_file_count}|{self.size_on_disk}|{self.last_aired}"
+
+
+class EpisodeFile:
+    FIELDS = ("path", "size", "seasonNumber")
+    __slots__ = ("path", "size", "season_number")
+
+    def __init__(self, path, size, season_number):
+        self.path = path
+        self.size = size
+        self.season_number = season_number
+
+    @classmethod
+    def from_api(cls, item: dict) -> "EpisodeFile":
+        return cls((item.get('path') or '').strip(), item.get('size') or 0, item.get('seasonNumber'))
+
+    def to_row(self) -> list:
+        return [self.path, self.size, self.season_number]
+
+    @classmethod
+    def from_row(cls, row) -> "EpisodeFile":
+        return cls(row[0], row[1], row[2])
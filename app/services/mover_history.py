@@ -0,0 +1,174 @@
+"""
+SQLite history of CA Mover runs with pre-aggregated trend tables
+"""
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+
+from app.services.protected_files import title_for_path
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = "/config/mover_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    timestamp REAL NOT NULL,
+    day TEXT NOT NULL,
+    is_run INTEGER NOT NULL,
+    excluded INTEGER NOT NULL,
+    moved INTEGER NOT NULL,
+    excluded_bytes INTEGER NOT NULL,
+    moved_bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_timestamp ON runs (timestamp);
+
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS paths_title ON paths (title);
+
+CREATE TABLE IF NOT EXISTS run_files (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    path_id INTEGER NOT NULL REFERENCES paths (id),
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS run_files_run ON run_files (run_id);
+CREATE INDEX IF NOT EXISTS run_files_path ON run_files (path_id);
+
+-- Maintained on insert so trend queries never scan run_files
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL,
+    excluded INTEGER NOT NULL,
+    moved INTEGER NOT NULL,
+    excluded_bytes INTEGER NOT NULL,
+    moved_bytes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS path_skips (
+    path_id INTEGER PRIMARY KEY REFERENCES paths (id),
+    skips INTEGER NOT NULL,
+    last_seen REAL NOT NULL,
+    last_size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS path_skips_count ON path_skips (skips);
+"""
+
+
+class MoverHistory:
+    """Every indexed mover run, stored once, with daily and per-path aggregates kept up to date on insert"""
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA foreign_keys=ON")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def run_names(self) -> set:
+        with self.lock:
+            return {row[0] for row in self._connect().execute("SELECT name FROM runs")}
+
+    def record_run(self, name: str, run: dict, protected) -> bool:
+        """Store one run and its protected files; a run already recorded is left alone"""
+        day = datetime.date.fromtimestamp(run["mtime"]).isoformat()
+        with self.lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    cur = conn.execute(
+                        "INSERT OR IGNORE INTO runs (name, timestamp, day, is_run, excluded, moved, excluded_bytes, moved_bytes) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (name, run["mtime"], day, int(run["is_run"]), run["excluded"], run["moved"],
+                         run["excluded_bytes"], run["moved_bytes"]),
+                    )
+                    if cur.rowcount == 0:
+                        return False
+                    run_id = cur.lastrowid
+                    conn.execute(
+                        "INSERT INTO daily (day, runs, excluded, moved, excluded_bytes, moved_bytes) VALUES (?, 1, ?, ?, ?, ?) "
+                        "ON CONFLICT (day) DO UPDATE SET runs = runs + 1, excluded = excluded + excluded.excluded, "
+                        "moved = moved + excluded.moved, excluded_bytes = excluded_bytes + excluded.excluded_bytes, "
+                        "moved_bytes = moved_bytes + excluded.moved_bytes",
+                        (day, run["excluded"], run["moved"], run["excluded_bytes"], run["moved_bytes"]),
+                    )
+                    if protected:
+                        conn.executemany(
+                            "INSERT OR IGNORE INTO paths (path, title) VALUES (?, ?)",
+                            ((path, title_for_path(path)) for path, _ in protected),
+                        )
+                        conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (path TEXT, size INTEGER)")
+                        conn.execute("DELETE FROM incoming")
+                        conn.executemany("INSERT INTO incoming (path, size) VALUES (?, ?)", protected)
+                        conn.execute(
+                            "INSERT INTO run_files (run_id, path_id, size) "
+                            "SELECT ?, paths.id, incoming.size FROM incoming JOIN paths ON paths.path = incoming.path",
+                            (run_id,),
+                        )
+                        conn.execute(
+                            "INSERT INTO path_skips (path_id, skips, last_seen, last_size) "
+                            "SELECT path_id, 1, ?, MAX(size) FROM run_files WHERE run_id = ? GROUP BY path_id "
+                            "ON CONFLICT (path_id) DO UPDATE SET skips = skips + 1, "
+                            "last_seen = MAX(last_seen, excluded.last_seen), "
+                            "last_size = CASE WHEN excluded.last_seen >= last_seen THEN excluded.last_size ELSE last_size END",
+                            (run["mtime"], run_id),
+                        )
+                return True
+            except Exception as e:
+                logger.error(f"Failed to record mover run {name}: {e}")
+                return False
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            cur = self._connect().execute(sql, params)
+            columns = [c[0] for c in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    def bytes_per_day(self, days: int = 30):
+        since = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+        return self._query(
+            "SELECT day, runs, excluded, moved, excluded_bytes, moved_bytes FROM daily WHERE day >= ? ORDER BY day",
+            (since,),
+        )
+
+    def top_protected_titles(self, limit: int = 20):
+        """Largest titles in the newest true run"""
+        return self._query(
+            "SELECT paths.title AS title, COUNT(*) AS files, SUM(run_files.size) AS bytes "
+            "FROM run_files JOIN paths ON paths.id = run_files.path_id "
+            "WHERE run_files.run_id = (SELECT id FROM runs WHERE is_run = 1 ORDER BY timestamp DESC LIMIT 1) "
+            "GROUP BY paths.title ORDER BY bytes DESC LIMIT ?",
+            (limit,),
+        )
+
+    def skip_frequency(self, limit: int = 50):
+        """Paths skipped (kept on cache) in the most runs"""
+        return self._query(
+            "SELECT paths.path AS path, paths.title AS title, path_skips.skips AS skips, "
+            "path_skips.last_seen AS last_seen, path_skips.last_size AS last_size "
+            "FROM path_skips JOIN paths ON paths.id = path_skips.path_id "
+            "ORDER BY path_skips.skips DESC, paths.path LIMIT ?",
+            (limit,),
+        )
+
+    def summary(self):
+        rows = self._query("SELECT COUNT(*) AS runs, SUM(is_run) AS true_runs, MIN(timestamp) AS first, MAX(timestamp) AS last FROM runs")
+        return rows[0]
+
+# Singleton instance
+_mover_history = MoverHistory()
+
+def get_mover_history():
+    return _mover_history
@@ -0,0 +1,331 @@
+"""
+Persistent index of parsed CA Mover Filtered_files lists
+"""
+import json
+import logging
+import os
+import threading
+import time
+import zipfile
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from app.core.metrics import get_registry
+from app.services.mover_history import get_mover_history
+from app.services.protected_files import ProtectedFiles
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = "/config/mover_index.json"
+# Bumped whenever the summary layout changes; older indexes are rebuilt from the logs
+INDEX_VERSION = 3
+# Lists modified more recently than this may still be being written; they are indexed but not yet added to history
+SETTLE_SECONDS = 60
+
+LIST_PARSE_SECONDS = get_registry().histogram("mover_list_parse_seconds", "Time to parse one Filtered_files list")
+LISTS_PARSED = get_registry().counter("mover_lists_parsed_total", "Filtered_files lists parsed, by outcome", ("outcome",))
+LIST_BYTES = get_registry().counter("mover_list_bytes_parsed_total", "Bytes of Filtered_files lists parsed")
+
+
+def parse_size(value) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_filtered_list(list_path):
+    """One pass over a Filtered_files list: (summary counts, ProtectedFiles)"""
+    summary = {"excluded": 0, "moved": 0, "excluded_bytes": 0, "moved_bytes": 0}
+    protected = ProtectedFiles()
+    with open(list_path, 'r', errors='replace') as f:
+        for line in f:
+            if "|" not in line:
+                continue
+            parts = [p.strip() for p in line.split("|")]
+            # Column 3 is status. If skipped, Column 4 is usually Path, Column 6 is size.
+            if len(parts) < 11:
+                continue
+            status = parts[3].lower()
+            if status == "skipped":
+                size = parse_size(parts[6])
+                summary["excluded"] += 1
+                summary["excluded_bytes"] += size
+                # We want the actual Path (often index 4 or 10)
+                protected.append(parts[10] if len(parts[10]) > 5 else parts[4], size)
+            elif status == "yes":
+                summary["moved"] += 1
+                summary["moved_bytes"] += parse_size(parts[6])
+    return summary, protected
+
+
+class Catalogue:
+    """Indexed runs plus their (mtime, name) order, with the newest true run and newest list tracked on every change"""
+    def __init__(self, runs=None):
+        self.runs = dict(runs or {})
+        self.order = sorted((run["mtime"], name) for name, run in self.runs.items())
+        self._find_latest()
+
+    def copy(self):
+        other = Catalogue.__new__(Catalogue)
+        other.runs, other.order = dict(self.runs), list(self.order)
+        other.latest_run, other.latest_any = self.latest_run, self.latest_any
+        return other
+
+    def _newer(self, name, current):
+        return current is None or (self.runs[name]["mtime"], name) > (self.runs[current]["mtime"], current)
+
+    def _find_latest(self):
+        """Walk back from the newest list to the first true run; only needed after the latest one is removed"""
+        self.latest_any = self.order[-1][1] if self.order else None
+        self.latest_run = next((name for _, name in reversed(self.order) if self.runs[name]["is_run"]), None)
+
+    def add(self, name, run):
+        if name in self.runs:
+            self.remove(name)
+        self.runs[name] = run
+        insort(self.order, (run["mtime"], name))
+        if self._newer(name, self.latest_any):
+            self.latest_any = name
+        if run["is_run"] and self._newer(name, self.latest_run):
+            self.latest_run = name
+
+    def remove(self, name):
+        run = self.runs.pop(name)
+        i = bisect_left(self.order, (run["mtime"], name))
+        del self.order[i]
+        if name in (self.latest_any, self.latest_run):
+            self._find_latest()
+
+    def shown(self):
+        """The run the UI shows: newest true run, else newest idle check"""
+        return self.latest_run or self.latest_any
+
+    def older_than(self, cutoff):
+        """Names of lists last modified before cutoff, oldest first"""
+        return [name for _, name in self.order[:bisect_left(self.order, (cutoff, ""))]]
+
+
+class MoverLogIndex:
+    """Summaries of every Filtered_files list, each parsed once.
+
+    Summaries for all runs are kept in a Catalogue sorted by mtime and
+    persisted to /config, so a restart re-parses nothing. The directory is
+    re-listed only when its mtime changes, and only new names are stat'ed and
+    parsed; lists still being written are re-checked until they settle. The
+    protected file list is kept only for the run the UI shows, since every
+    run's list can hold tens of thousands of paths.
+    """
+    def __init__(self, log_dir="/mover_logs", path=INDEX_PATH):
+        self.log_dir = log_dir
+        self.path = path
+        # lock guards the published state; update_lock makes updates and retention single-flight
+        self.lock = threading.Lock()
+        self.update_lock = threading.Lock()
+        self.catalogue = None
+        self.latest_files = {"name": None, "files": ProtectedFiles()}
+        self.dir_mtime = None
+        self.pending = set()
+
+    def _load(self):
+        with self.lock:
+            if self.catalogue is not None:
+                return
+            runs = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r') as f:
+                        data = json.load(f)
+                    if data.get("version") == INDEX_VERSION and data.get("log_dir") == self.log_dir:
+                        runs = data["runs"]
+                        latest = data["latest_files"]
+                        self.latest_files = {"name": latest["name"], "files": ProtectedFiles.from_json(latest)}
+                except Exception as e:
+                    logger.warning(f"Discarding unreadable mover index: {e}")
+            self.catalogue = Catalogue(runs)
+
+    def _publish(self, catalogue, latest_files):
+        with self.lock:
+            self.catalogue, self.latest_files = catalogue, latest_files
+        self._save(catalogue.runs, latest_files)
+
+    def update(self) -> int:
+        """Parse new or changed lists and forget deleted ones; returns how many lists were parsed.
+
+        Parsing happens on a copy, so readers keep seeing the previous state until it is swapped in.
+        """
+        with self.update_lock:
+            self._load()
+            try:
+                dir_mtime = os.stat(self.log_dir).st_mtime_ns
+            except FileNotFoundError:
+                return 0
+            # Names added or removed always bump the directory mtime; in-progress lists are tracked in pending
+            if dir_mtime == self.dir_mtime and not self.pending:
+                return 0
+            history = get_mover_history()
+            recorded = history.run_names()
+            with self.lock:
+                catalogue, latest_files = self.catalogue.copy(), self.latest_files
+
+            if dir_mtime != self.dir_mtime:
+                names = {
+                    entry.name for entry in os.scandir(self.log_dir)
+                    if entry.name.startswith("Filtered_files_") and entry.name.endswith(".list")
+                }
+                for name in [n for n in catalogue.runs if n not in names]:
+                    catalogue.remove(name)
+                # Backfill history for indexed lists that were never recorded
+                to_check = (names - catalogue.runs.keys()) | {n for n in names if n not in recorded} | self.pending
+            else:
+                to_check = set(self.pending)
+
+            changed = len(catalogue.runs) != len(self.catalogue.runs)
+            pending, parsed = set(), 0
+            # Paths of the newest list parsed in this pass, in case it becomes the one to show
+            fresh = {}
+            for name in sorted(to_check):
+                try:
+                    st = os.stat(os.path.join(self.log_dir, name))
+                except FileNotFoundError:
+                    if name in catalogue.runs:
+                        catalogue.remove(name)
+                        changed = True
+                    continue
+                settled = time.time() - st.st_mtime > SETTLE_SECONDS
+                if not settled:
+                    pending.add(name)
+                run = catalogue.runs.get(name)
+                if run and run["size"] == st.st_size and run["mtime"] == st.st_mtime and (name in recorded or not settled):
+                    continue
+                try:
+                    with LIST_PARSE_SECONDS.time():
+                        summary, protected = parse_filtered_list(os.path.join(self.log_dir, name))
+                except Exception as e:
+                    LISTS_PARSED.inc(outcome="error")
+                    logger.error(f"Failed to parse list {name}: {e}")
+                    continue
+                LISTS_PARSED.inc(outcome="ok")
+                LIST_BYTES.inc(st.st_size)
+                timestamp_str = name.replace("Filtered_files_", "").replace(".list", "")
+                run = {
+                    "size": st.st_size,
+                    "mtime": st.st_mtime,
+                    "log_name": f"Mover_tuning_{timestamp_str}.log",
+                    # Idle checks write only a header; any file row means Mover actually ran
+                    "is_run": summary["excluded"] + summary["moved"] > 0,
+                    **summary,
+                }
+                catalogue.add(name, run)
+                if settled:
+                    history.record_run(name, run, protected)
+                if name == catalogue.shown():
+                    fresh = {"name": name, "files": protected}
+                parsed += 1
+                changed = True
+
+            shown = catalogue.shown()
+            if fresh.get("name") == shown:
+                latest_files = fresh
+            elif shown != latest_files["name"]:
+                # The shown run was deleted and an older one takes its place
+                latest_files = {"name": shown, "files": ProtectedFiles()}
+                if shown:
+                    try:
+                        _, latest_files["files"] = parse_filtered_list(os.path.join(self.log_dir, shown))
+                    except Exception as e:
+                        logger.error(f"Failed to parse list {shown}: {e}")
+                changed = True
+
+            if changed:
+                self._publish(catalogue, latest_files)
+            self.dir_mtime, self.pending = dir_mtime, pending
+            if parsed:
+                logger.info(f"Mover index: parsed {parsed} new list(s), {len(catalogue.runs)} indexed")
+            return parsed
+
+    def apply_retention(self, days: int, action: str = "compress") -> int:
+        """Compress or delete idle-check lists (and their Mover_tuning logs) older than days.
+
+        Only lists already recorded in the history database are touched, and
+        never the one the UI shows. 'compress' moves them into a per-month
+        Idle_checks_YYYY-MM.zip in the log directory.
+        """
+        if days <= 0:
+            return 0
+        with self.update_lock:
+            self._load()
+            recorded = get_mover_history().run_names()
+            with self.lock:
+                catalogue, latest_files = self.catalogue.copy(), self.latest_files
+            shown = catalogue.shown()
+            expired = [
+                name for name in catalogue.older_than(time.time() - days * 86400)
+                if not catalogue.runs[name]["is_run"] and name in recorded and name != shown
+            ]
+            if not expired:
+                return 0
+
+            archives, removed = {}, 0
+            try:
+                for name in expired:
+                    files = [name, catalogue.runs[name]["log_name"]]
+                    paths = [(f, os.path.join(self.log_dir, f)) for f in files]
+                    paths = [(f, p) for f, p in paths if os.path.exists(p)]
+                    try:
+                        if action == "compress":
+                            month = datetime.fromtimestamp(catalogue.runs[name]["mtime"]).strftime("%Y-%m")
+                            archive = archives.get(month)
+                            if archive is None:
+                                archive = zipfile.ZipFile(os.path.join(self.log_dir, f"Idle_checks_{month}.zip"), 'a', zipfile.ZIP_DEFLATED)
+                                archives[month] = archive
+                            for arcname, path in paths:
+                                archive.write(path, arcname)
+                        for _, path in paths:
+                            os.unlink(path)
+                    except Exception as e:
+                        logger.error(f"Retention failed for {name}: {e}")
+                        continue
+                    catalogue.remove(name)
+                    removed += 1
+            finally:
+                for archive in archives.values():
+                    archive.close()
+
+            self._publish(catalogue, latest_files)
+            logger.info(f"Mover log retention: {'compressed' if action == 'compress' else 'deleted'} {removed} idle check(s) older than {days} days")
+            return removed
+
+    def _save(self, runs, latest_files):
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    "version": INDEX_VERSION,
+                    "log_dir": self.log_dir,
+                    "runs": runs,
+                    "latest_files": {"name": latest_files["name"], **latest_files["files"].to_json()},
+                }, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save mover index: {e}")
+
+    def count(self) -> int:
+        self._load()
+        with self.lock:
+            return len(self.catalogue.runs)
+
+    def latest(self):
+        """(name, summary, ProtectedFiles) of the run to show, or None; never parses or scans"""
+        self._load()
+        with self.lock:
+            name = self.catalogue.shown()
+            if not name or name != self.latest_files["name"]:
+                return None
+            return name, self.catalogue.runs[name], self.latest_files["files"]
+
+# Singleton instance
+_mover_index = MoverLogIndex()
+
+def get_mover_index():
+    return _mover_index
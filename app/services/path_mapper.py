@@ -0,0 +1,81 @@
+"""
+Path rewrite rules compiled once per build from the exclusion settings
+"""
+from typing import Dict, Iterable, List, Tuple
+
+from app.core.config import ExclusionSettings
+
+SOURCES = ("radarr", "sonarr", "plexcache")
+
+
+class PrefixTable:
+    """Longest-prefix-wins lookup: one dict per distinct prefix length, longest first"""
+
+    def __init__(self, rules: Iterable[Tuple[str, str]]):
+        by_length: Dict[int, Dict[str, str]] = {}
+        for from_prefix, to_prefix in rules:
+            if from_prefix:
+                # First rule registered for a prefix wins, matching the old in-order fallback
+                by_length.setdefault(len(from_prefix), {}).setdefault(from_prefix, to_prefix)
+        self.tables = sorted(by_length.items(), reverse=True)
+
+    def match(self, path: str):
+        """Return (from_prefix, to_prefix) of the longest matching rule, or None"""
+        for length, table in self.tables:
+            to_prefix = table.get(path[:length])
+            if to_prefix is not None:
+                return path[:length], to_prefix
+        return None
+
+    def rewrite(self, path: str) -> str:
+        for length, table in self.tables:
+            to_prefix = table.get(path[:length])
+            if to_prefix is not None:
+                return to_prefix + path[length:]
+        return path
+
+
+class PathMapper:
+    def __init__(self, exclusions: ExclusionSettings):
+        rules = {}
+        for source in SOURCES:
+            mappings = [getattr(exclusions, f"{source}_mapping")] + list(getattr(exclusions, f"{source}_extra_mappings"))
+            rules[source] = [(m.from_prefix, m.to_prefix) for m in mappings]
+        self.tables = {source: PrefixTable(rules[source]) for source in SOURCES}
+        # Paths without a known source (custom folders) may match any service's rules
+        self.tables[""] = PrefixTable(r for source in SOURCES for r in rules[source])
+
+        self.host = exclusions.host_cache_path.rstrip('/')
+        self.container = exclusions.cache_mount_path.rstrip('/')
+        # PlexCache raw prefixes (e.g. /chloe) have no container mount and are matched without the trailing slash
+        self.plexcache_raw = PrefixTable(
+            (f.rstrip('/') + '/', t) for f, t in rules["plexcache"] if f.rstrip('/')
+        )
+
+    def rewrite(self, path: str, source: str = "") -> str:
+        """Apply the source's path mappings to rewrite a path for the exclusion file"""
+        return self.tables.get(source, self.tables[""]).rewrite(path)
+
+    def rewrite_all(self, items: Iterable[Tuple[str, str]]) -> List[Tuple[str, str, str]]:
+        """Rewrite (path, source) pairs in one pass, returning (path, source, mapped) triples"""
+        tables = self.tables
+        fallback = tables[""]
+        return [(p, source, tables.get(source, fallback).rewrite(p)) for p, source in items]
+
+    def to_container(self, path: str) -> str:
+        """Translate any path to the container-accessible path used for existence checks"""
+        host, container = self.host, self.container
+        # Already a full host path (e.g. /mnt/chloe/data/...) -> swap prefix
+        if path.startswith(host + '/') or path == host:
+            return container + path[len(host):]
+        # PlexCache raw path (e.g. /chloe/tv/...) -> /mnt/cache/data/media/tv/...
+        rule = self.plexcache_raw.match(path)
+        if rule:
+            pc_from, pc_to = rule
+            mapped = pc_to.rstrip('/') + '/' + path[len(pc_from) - 1:].lstrip('/')
+            return container + mapped[len(host):] if mapped.startswith(host) else container + '/' + mapped.lstrip('/')
+        # Path already starts with container mount (e.g. /mnt/cache/...) -> use as-is
+        if path.startswith(container + '/') or path == container:
+            return path
+        # Relative path (e.g. /data/media/movies/...) -> /mnt/cache/data/media/movies/
+        return container + '/' + path.lstrip('/')
@@ -0,0 +1,89 @@
+"""
+Batch existence checks for candidate paths on the cache mount
+"""
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def list_dir(parent: str):
+    """Names in a directory, an empty set if it doesn't exist, or None if it can't be listed"""
+    try:
+        with os.scandir(parent) as it:
+            return {entry.name for entry in it}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+    except OSError as e:
+        logger.debug(f"Cannot list {parent!r}, falling back to per-path checks: {e}")
+        return None
+
+
+def _scan_dir(parent: str):
+    """Like list_dir, but mapping each name that really exists to whether it is a directory.
+
+    Symlinks are followed, so a broken one is left out as os.path.exists
+    would; only they cost a stat, other entries are typed by the listing.
+    """
+    try:
+        found = {}
+        with os.scandir(parent) as it:
+            for entry in it:
+                try:
+                    found[entry.name] = entry.is_dir()
+                    if entry.is_symlink():
+                        entry.stat()
+                except OSError:
+                    found.pop(entry.name, None)
+        return found
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+    except OSError as e:
+        logger.debug(f"Cannot list {parent!r}, falling back to per-path checks: {e}")
+        return None
+
+
+def check_paths_exist(paths: Iterable[str], workers: int = 8) -> Tuple[Set[str], dict]:
+    """Return the subset of paths that exist, listing each parent directory once.
+
+    Matches os.path.exists: broken symlinks don't exist, and a path with a
+    trailing slash only exists if it is a directory.
+
+    Directory listings fan out across a thread pool since network and FUSE
+    mounts (shfs, ZFS over NFS) are latency-bound rather than CPU-bound.
+    """
+    start = time.perf_counter()
+    by_parent = defaultdict(list)
+    candidates = 0
+    for path in paths:
+        candidates += 1
+        parent, name = os.path.split(path.rstrip('/'))
+        by_parent[parent].append((path, name))
+
+    existing = set()
+    syscalls = 0
+    parents = list(by_parent)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="path-check") as pool:
+        listings = pool.map(_scan_dir, parents)
+        for parent, names in zip(parents, listings):
+            syscalls += 1
+            for path, name in by_parent[parent]:
+                if names is None or not name:
+                    # Unlistable directory or filesystem root
+                    syscalls += 1
+                    if os.path.exists(path):
+                        existing.add(path)
+                elif name in names and (names[name] or not path.endswith('/')):
+                    existing.add(path)
+
+    stats = {
+        "candidates": candidates,
+        "directories": len(parents),
+        "syscalls_saved": max(0, candidates - syscalls),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    return existing, stats
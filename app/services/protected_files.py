@@ -0,0 +1,109 @@
+"""
+Column-oriented list of protected files from a mover run, with byte-exact size rollups
+"""
+import re
+from array import array
+from typing import Iterable, List, Tuple
+
+_SEASON = re.compile(r"^(season|specials?)\b", re.IGNORECASE)
+
+
+def title_for_path(path: str) -> str:
+    """Movie or series folder a protected file belongs to ('Show/Season 1/x.mkv' -> 'Show')"""
+    parts = [p for p in path.split('/') if p]
+    if len(parts) < 2:
+        return path
+    folder = parts[-2]
+    if _SEASON.match(folder) and len(parts) >= 3:
+        folder = parts[-3]
+    return folder
+
+
+def _classify_folder(folder: str) -> Tuple[str, str, str]:
+    """(share path, 'series' or 'movies', group path) for a directory holding protected files"""
+    parts = folder.split('/')
+    # /mnt/<pool>/<share>/... -> /mnt/<pool>/<share>; otherwise the first component
+    depth = 4 if len(parts) > 3 and parts[1] == 'mnt' else 2
+    share = '/'.join(parts[:depth]) or '/'
+    if _SEASON.match(parts[-1]) and len(parts) > 2:
+        return share, 'series', '/'.join(parts[:-1])
+    return share, 'movies', folder
+
+
+class ProtectedFiles:
+    """Paths and raw byte sizes kept as parallel columns (a list and an unsigned 64-bit array)"""
+    __slots__ = ("paths", "sizes", "_rollup")
+
+    def __init__(self, paths: Iterable[str] = (), sizes: Iterable[int] = ()):
+        self.paths: List[str] = list(paths)
+        self.sizes = array('Q', sizes)
+        self._rollup = None
+
+    def __len__(self):
+        return len(self.paths)
+
+    def append(self, path: str, size: int):
+        self.paths.append(path)
+        self.sizes.append(size)
+
+    def __iter__(self):
+        """(path, bytes) rows"""
+        return zip(self.paths, self.sizes)
+
+    def to_json(self) -> dict:
+        return {"paths": self.paths, "sizes": self.sizes.tolist()}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ProtectedFiles":
+        return cls(data.get("paths", []), data.get("sizes", []))
+
+    def rollup(self, top: int = 25) -> dict:
+        """Exact totals per top-level share, series and movie folder; computed once per run.
+
+        Files are summed per parent directory in one pass (a dict update per
+        row), then the far fewer directories are rolled up into their groups.
+        """
+        if self._rollup is None:
+            by_folder = {}
+            for path, size in zip(self.paths, self.sizes):
+                folder = path.rpartition('/')[0]
+                entry = by_folder.get(folder)
+                if entry is None:
+                    by_folder[folder] = [size, 1]
+                else:
+                    entry[0] += size
+                    entry[1] += 1
+
+            groups = {"shares": {}, "series": {}, "movies": {}}
+            for folder, (size, count) in by_folder.items():
+                share, kind, group = _classify_folder(folder)
+                for bucket, key in ((groups["shares"], share), (groups[kind], group)):
+                    entry = bucket.setdefault(key, [0, 0])
+                    entry[0] += size
+                    entry[1] += count
+
+            self._rollup = {
+                "total_bytes": sum(self.sizes),
+                "files": len(self.paths),
+                **{
+                    kind: [
+                        {"path": key, "name": key.rpartition('/')[2] or key, "bytes": size, "files": count}
+                        for key, (size, count) in sorted(bucket.items(), key=lambda kv: kv[1][0], reverse=True)
+                    ]
+                    for kind, bucket in groups.items()
+                },
+            }
+        return {
+            key: value[:top] if isinstance(value, list) else value
+            for key, value in self._rollup.items()
+        }
+
+    def search(self, q: str = "", offset: int = 0, limit: int = 200):
+        """(total matches, [(path, bytes), ...]) for a case-insensitive substring filter"""
+        if not q:
+            ids = range(len(self.paths))
+        else:
+            needle = q.casefold()
+            ids = [i for i, path in enumerate(self.paths) if needle in path.casefold()]
+        page = ids[offset:offset + limit]
+        return len(ids), [(self.paths[i], self.sizes[i]) for i in page]
@@ -1,6 +1,9 @@
-import requests
+import asyncio
 import logging
+import threading
 from app.core.config import get_user_settings
+from app.services.media import Movie
+from app.services.http_session import build_session, build_async_client, client_key, request_with_retry, stream_json_list, astream_json_list
 
 logger = logging.getLogger(__name__)
 
@@ -9,41 +12,121 @@ class RadarrClient:
         self.settings = get_user_settings()
         self.url = self.settings.radarr.url.rstrip('/')
         self.api_key = self.settings.radarr.api_key
-
-    def _get_headers(self):
-        return {'X-Api-Key': self.api_key}
+        self.key = client_key(self.url, self.api_key, self.settings.http)
+        self.session = build_session(self.url, self.api_key, self.settings.http, "radarr")
 
     def test_connection(self):
         if not self.url or not self.api_key: return False
         try:
-            return requests.get(f"{self.url}/api/v3/system/status", headers=self._get_headers(), timeout=5).status_code == 200
+            return self.session.get(f"{self.url}/api/v3/system/status", timeout=5).status_code == 200
         except: return False
 
-    def get_all_movies(self):
-        """Get all movies from Radarr"""
+
+    def get_movie_records(self):
+        """Get all movies from Radarr as compact Movie records, or None if the fetch failed"""
         if not self.url or not self.api_key: return []
         try:
-            response = requests.get(f"{self.url}/api/v3/movie", headers=self._get_headers(), timeout=60)
-            response.raise_for_status()
-            return response.json()
+            return stream_json_list(self.session, f"{self.url}/api/v3/movie", Movie.FIELDS, Movie.from_api, timeout=60)
         except Exception as e:
             logger.error(f"Failed to fetch movies: {e}")
-            return []
+            return None
+
+    def get_movie_record(self, movie_id, timeout=10):
+        """One movie as a compact Movie record, or None if Radarr no longer has it; other errors raise"""
+        response = self.session.get(f"{self.url}/api/v3/movie/{movie_id}", timeout=timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return Movie.from_api(response.json())
 
     def get_all_tags(self):
+        """All tags, or None if the fetch failed"""
         if not self.url or not self.api_key: return []
         try:
-            response = requests.get(f"{self.url}/api/v3/tag", headers=self._get_headers(), timeout=10)
+            response = self.session.get(f"{self.url}/api/v3/tag", timeout=10)
             response.raise_for_status()
             return response.json()
-        except: return []
+        except Exception as e:
+            logger.error(f"Failed to fetch tags: {e}")
+            return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_radarr_client():
+    """Long-lived client, rebuilt when the Radarr URL, API key or HTTP settings change"""
+    global _client
+    settings = get_user_settings()
+    key = client_key(settings.radarr.url.rstrip('/'), settings.radarr.api_key, settings.http)
+    with _client_lock:
+        if _client is None or _client.key != key:
+            old = _client
+            _client = RadarrClient()
+            if old is not None:
+                # Requests already running on the old session finish; its idle connections are dropped
+                old.session.close()
+        return _client
+
+
+class AsyncRadarrClient:
+    """Non-blocking Radarr client for the FastAPI routes; the scheduler jobs keep using RadarrClient"""
+    def __init__(self):
+        self.settings = get_user_settings()
+        self.url = self.settings.radarr.url.rstrip('/')
+        self.api_key = self.settings.radarr.api_key
+        self.key = client_key(self.url, self.api_key, self.settings.http)
+        self.client = build_async_client(self.api_key, self.settings.http, "radarr")
+        # httpx connection pools belong to the event loop that created them
+        self.loop = asyncio.get_running_loop()
+
+    async def _request(self, method, path, retry=True, **kwargs):
+        return await request_with_retry(self.client, method, f"{self.url}{path}", self.settings.http, retry=retry, **kwargs)
 
-    def update_movie(self, movie_data):
+    async def test_connection(self):
+        if not self.url or not self.api_key: return False
         try:
-            mid = movie_data.get('id')
-            requests.put(f"{self.url}/api/v3/movie/{mid}", json=movie_data, headers=self._get_headers()).raise_for_status()
-            return True
+            return (await self._request("GET", "/api/v3/system/status", retry=False, timeout=5)).status_code == 200
         except: return False
 
-def get_radarr_client():
-    return RadarrClient()
+
+    async def get_movie_records(self):
+        """Get all movies from Radarr as compact Movie records, or None if the fetch failed"""
+        if not self.url or not self.api_key: return []
+        try:
+            return await astream_json_list(self.client, f"{self.url}/api/v3/movie", self.settings.http, Movie.FIELDS, Movie.from_api, timeout=60)
+        except Exception as e:
+            logger.error(f"Failed to fetch movies: {e}")
+            return None
+
+    async def get_all_tags(self):
+        """All tags, or None if the fetch failed"""
+        if not self.url or not self.api_key: return []
+        try:
+            response = await self._request("GET", "/api/v3/tag", timeout=10)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to fetch tags: {e}")
+            return None
+
+_async_client = None
+
+def get_async_radarr_client():
+    """Long-lived async client for the running event loop, rebuilt when settings change"""
+    global _async_client
+    settings = get_user_settings()
+    key = client_key(settings.radarr.url.rstrip('/'), settings.radarr.api_key, settings.http)
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.key != key or _async_client.loop is not loop:
+        old = _async_client
+        _async_client = AsyncRadarrClient()
+        if old is not None and old.loop is loop:
+            loop.create_task(old.client.aclose())
+    return _async_client
+
+async def close_async_radarr_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.client.aclose()
+        _async_client = None
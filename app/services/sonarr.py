@@ -1,6 +1,9 @@
-import requests
+import asyncio
 import logging
+import threading
 from app.core.config import get_user_settings
+from app.services.media import Series, EpisodeFile
+from app.services.http_session import build_session, build_async_client, client_key, request_with_retry, stream_json_list, astream_json_list
 
 logger = logging.getLogger(__name__)
 
@@ -9,45 +12,135 @@ class SonarrClient:
         self.settings = get_user_settings()
         self.url = self.settings.sonarr.url.rstrip('/')
         self.api_key = self.settings.sonarr.api_key
-
-    def _get_headers(self):
-        return {'X-Api-Key': self.api_key}
+        # The build fetches episode files from sonarr_fetch_workers threads over this one session
+        workers = self.settings.exclusions.sonarr_fetch_workers
+        self.key = client_key(self.url, self.api_key, self.settings.http, workers)
+        self.session = build_session(self.url, self.api_key, self.settings.http, "sonarr", workers)
 
     def test_connection(self):
         if not self.url or not self.api_key: return False
         try:
-            return requests.get(f"{self.url}/api/v3/system/status", headers=self._get_headers(), timeout=5).status_code == 200
+            return self.session.get(f"{self.url}/api/v3/system/status", timeout=5).status_code == 200
         except: return False
 
-    def get_all_series(self):
-        """Get all series from Sonarr"""
+
+
+    def get_series_records(self):
+        """Get all series from Sonarr as compact Series records, or None if the fetch failed"""
         if not self.url or not self.api_key: return []
         try:
-            response = requests.get(f"{self.url}/api/v3/series", headers=self._get_headers(), timeout=60)
-            response.raise_for_status()
-            return response.json()
+            return stream_json_list(self.session, f"{self.url}/api/v3/series", Series.FIELDS, Series.from_api, timeout=60)
         except Exception as e:
             logger.error(f"Failed to fetch shows: {e}")
-            return []
+            return None
+
+    def get_series_record(self, series_id, timeout=10):
+        """One series as a compact Series record, or None if Sonarr no longer has it; other errors raise"""
+        response = self.session.get(f"{self.url}/api/v3/series/{series_id}", timeout=timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return Series.from_api(response.json())
 
-    def get_episode_files(self, series_id):
-        """Returns actual files on disk for a series"""
+    def get_episode_file_records(self, series_id, timeout=60):
+        """Episode files on disk for a series as compact EpisodeFile records"""
         if not self.url or not self.api_key: return []
         try:
-            response = requests.get(f"{self.url}/api/v3/episodefile?seriesId={series_id}", headers=self._get_headers(), timeout=60)
-            response.raise_for_status()
-            return response.json()
+            return stream_json_list(self.session, f"{self.url}/api/v3/episodefile", EpisodeFile.FIELDS, EpisodeFile.from_api,
+                                    params={"seriesId": series_id}, timeout=timeout)
         except Exception as e:
             logger.error(f"Failed to fetch episodes for series {series_id}: {e}")
             return []
 
     def get_all_tags(self):
+        """All tags, or None if the fetch failed"""
         if not self.url or not self.api_key: return []
         try:
-            response = requests.get(f"{self.url}/api/v3/tag", headers=self._get_headers(), timeout=10)
+            response = self.session.get(f"{self.url}/api/v3/tag", timeout=10)
             response.raise_for_status()
             return response.json()
-        except: return []
+        except Exception as e:
+            logger.error(f"Failed to fetch tags: {e}")
+            return None
+
+_client = None
+_client_lock = threading.Lock()
 
 def get_sonarr_client():
-    return SonarrClient()
+    """Long-lived client, rebuilt when the Sonarr URL, API key, HTTP settings or fetch workers change"""
+    global _client
+    settings = get_user_settings()
+    key = client_key(settings.sonarr.url.rstrip('/'), settings.sonarr.api_key, settings.http,
+                     settings.exclusions.sonarr_fetch_workers)
+    with _client_lock:
+        if _client is None or _client.key != key:
+            old = _client
+            _client = SonarrClient()
+            if old is not None:
+                # Requests already running on the old session finish; its idle connections are dropped
+                old.session.close()
+        return _client
+
+
+class AsyncSonarrClient:
+    """Non-blocking Sonarr client for the FastAPI routes; the scheduler jobs keep using SonarrClient"""
+    def __init__(self):
+        self.settings = get_user_settings()
+        self.url = self.settings.sonarr.url.rstrip('/')
+        self.api_key = self.settings.sonarr.api_key
+        self.key = client_key(self.url, self.api_key, self.settings.http)
+        self.client = build_async_client(self.api_key, self.settings.http, "sonarr")
+        # httpx connection pools belong to the event loop that created them
+        self.loop = asyncio.get_running_loop()
+
+    async def _request(self, method, path, retry=True, **kwargs):
+        return await request_with_retry(self.client, method, f"{self.url}{path}", self.settings.http, retry=retry, **kwargs)
+
+    async def test_connection(self):
+        if not self.url or not self.api_key: return False
+        try:
+            return (await self._request("GET", "/api/v3/system/status", retry=False, timeout=5)).status_code == 200
+        except: return False
+
+
+
+    async def get_series_records(self):
+        """Get all series from Sonarr as compact Series records, or None if the fetch failed"""
+        if not self.url or not self.api_key: return []
+        try:
+            return await astream_json_list(self.client, f"{self.url}/api/v3/series", self.settings.http, Series.FIELDS, Series.from_api, timeout=60)
+        except Exception as e:
+            logger.error(f"Failed to fetch shows: {e}")
+            return None
+
+    async def get_all_tags(self):
+        """All tags, or None if the fetch failed"""
+        if not self.url or not self.api_key: return []
+        try:
+            response = await self._request("GET", "/api/v3/tag", timeout=10)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to fetch tags: {e}")
+            return None
+
+_async_client = None
+
+def get_async_sonarr_client():
+    """Long-lived async client for the running event loop, rebuilt when settings change"""
+    global _async_client
+    settings = get_user_settings()
+    key = client_key(settings.sonarr.url.rstrip('/'), settings.sonarr.api_key, settings.http)
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.key != key or _async_client.loop is not loop:
+        old = _async_client
+        _async_client = AsyncSonarrClient()
+        if old is not None and old.loop is loop:
+            loop.create_task(old.client.aclose())
+    return _async_client
+
+async def close_async_sonarr_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.client.aclose()
+        _async_client = None
@@ -1,55 +1,136 @@
 """
-Simple stats from the exclusion file
+Movie, TV and total counts of the exclusion file, kept up to date by the builder
 """
+import datetime
+import json
 import logging
 import os
+import threading
+
+from app.services.exclusion_index import EXCLUSIONS_PATH, get_exclusion_index
 
 logger = logging.getLogger(__name__)
 
+STATS_PATH = "/config/exclusion_stats.json"
+# Which counter each builder source feeds; PlexCache and custom folders only count towards the total
+SOURCE_KINDS = {"radarr": "movie", "sonarr": "tv"}
+
+
+def _guess_kind(line: str) -> str:
+    """Fallback for lines no build produced (manual edits): classify by path pattern"""
+    line_lower = line.lower()
+    if '/movies/' in line_lower or '/movie/' in line_lower:
+        return "movie"
+    if '/tv/' in line_lower or '/shows/' in line_lower or '/series/' in line_lower:
+        return "tv"
+    return ""
+
+
 class StatsCache:
-    def __init__(self):
+    """Counts pushed by ExclusionManager.build_exclusions from the source of each path.
+
+    Reading the counts costs one stat() of the exclusion file. Only when its
+    mtime or size no longer matches what the last build wrote (an external
+    edit) are the lines recounted, using the source the last build gave each
+    path and falling back to path patterns for lines it did not write.
+    Counts are persisted so a restart doesn't need a build or a recount.
+    """
+    def __init__(self, path=EXCLUSIONS_PATH, stats_path=STATS_PATH):
+        self.path = path
+        self.stats_path = stats_path
+        self.lock = threading.Lock()
         self.movie_count = 0
         self.tv_count = 0
         self.total_count = 0
         self.last_update = None
-    
+        # Mapped path -> source from the last build, for classifying lines after an external edit
+        self.sources = {}
+        self._stamp = None
+        self._loaded = False
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return [st.st_mtime_ns, st.st_size]
+        except FileNotFoundError:
+            return None
+
+    def _set(self, counts: dict, stamp):
+        self.movie_count = counts.get("movie", 0)
+        self.tv_count = counts.get("tv", 0)
+        self.total_count = sum(counts.values())
+        self.last_update = datetime.datetime.now()
+        self._stamp = stamp
+
+    def _load(self):
+        self._loaded = True
+        if not os.path.exists(self.stats_path):
+            return
+        try:
+            with open(self.stats_path, 'r') as f:
+                data = json.load(f)
+            self.movie_count = data["movie_count"]
+            self.tv_count = data["tv_count"]
+            self.total_count = data["total_count"]
+            self.last_update = datetime.datetime.fromisoformat(data["last_update"])
+            self._stamp = data["stamp"]
+        except Exception as e:
+            logger.warning(f"Discarding unreadable exclusion stats: {e}")
+
+    def _save(self):
+        try:
+            tmp_path = f"{self.stats_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    "stamp": self._stamp,
+                    "movie_count": self.movie_count,
+                    "tv_count": self.tv_count,
+                    "total_count": self.total_count,
+                    "last_update": self.last_update.isoformat(),
+                }, f)
+            os.replace(tmp_path, self.stats_path)
+        except Exception as e:
+            logger.error(f"Failed to save exclusion stats: {e}")
+
+    def update_from_build(self, sources: dict):
+        """Take the counts from a finished build; sources maps each written path to its builder source"""
+        counts = {}
+        for source in sources.values():
+            kind = SOURCE_KINDS.get(source, "")
+            counts[kind] = counts.get(kind, 0) + 1
+        with self.lock:
+            self._loaded = True
+            self.sources = sources
+            self._set(counts, self._file_stamp())
+            self._save()
+        logger.info(f"Stats updated: {self.movie_count} movies, {self.tv_count} TV, {self.total_count} total exclusions")
+
     def refresh_from_file(self):
-        """Read exclusion file and count movies vs TV"""
-        movie_count = 0
-        tv_count = 0
-        total_count = 0
-        
-        exclusions_file = "/config/mover_exclusions.txt"
-        if os.path.exists(exclusions_file):
+        """Recount the exclusion file as it is on disk (after an external edit)"""
+        with self.lock:
+            stamp = self._file_stamp()
+            counts = {}
             try:
-                with open(exclusions_file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        total_count += 1
-                        
-                        # Count based on path patterns
-                        line_lower = line.lower()
-                        if '/movies/' in line_lower or '/movie/' in line_lower:
-                            movie_count += 1
-                        elif '/tv/' in line_lower or '/shows/' in line_lower or '/series/' in line_lower:
-                            tv_count += 1
-                
-                self.movie_count = movie_count
-                self.tv_count = tv_count
-                self.total_count = total_count
-                
-                import datetime
-                self.last_update = datetime.datetime.now()
-                
-                logger.info(f"Stats updated: {movie_count} movies, {tv_count} TV, {total_count} total exclusions")
+                sources = self.sources
+                for line in get_exclusion_index().lines() if stamp else []:
+                    source = sources.get(line)
+                    kind = SOURCE_KINDS.get(source, "") if source is not None else _guess_kind(line)
+                    counts[kind] = counts.get(kind, 0) + 1
             except Exception as e:
                 logger.error(f"Error reading exclusion file: {e}")
-    
+                return
+            self._set(counts, stamp)
+            self._save()
+        logger.info(f"Stats recounted from file: {self.movie_count} movies, {self.tv_count} TV, {self.total_count} total exclusions")
+
     def get_counts(self):
-        """Get current counts"""
+        """Get current counts, recounting only if the file changed outside a build"""
+        if not self._loaded:
+            with self.lock:
+                if not self._loaded:
+                    self._load()
+        if self._file_stamp() != self._stamp:
+            self.refresh_from_file()
         return {
             "movie_count": self.movie_count,
             "tv_count": self.tv_count,
@@ -0,0 +1,132 @@
+"""
+Incremental exclusion updates from Radarr and Sonarr webhook (Connect) events.
+
+Each event names one movie or series. Its current record is fetched, the
+same tag, existence and mapping rules as the full build are applied to that
+title alone, and its entries in the exclusion set are replaced.
+"""
+import logging
+import os
+
+from app.core.config import get_user_settings
+from app.core.metrics import get_registry
+from app.services.radarr import get_radarr_client
+from app.services.sonarr import get_sonarr_client
+from app.services.episode_cache import get_episode_cache
+from app.services.library_cache import get_library_cache
+from app.services.exclusion_set import TitleUpdate, get_exclusion_set
+from app.services.folder_collapse import collapse_episode_files
+from app.services.cache_budget import BudgetItem, get_cache_budget, tag_priority
+from app.services.path_mapper import PathMapper
+from app.services.path_validator import check_paths_exist
+
+logger = logging.getLogger(__name__)
+
+# Events that don't change which files a title has on disk
+IGNORED_EVENTS = {"Test", "Grab", "Health", "HealthRestored", "ApplicationUpdate", "ManualInteractionRequired"}
+
+WEBHOOK_EVENTS = get_registry().counter(
+    "webhook_events_total", "Radarr/Sonarr webhook events by service, event type and outcome", ("service", "event", "outcome"))
+WEBHOOK_SECONDS = get_registry().histogram(
+    "webhook_apply_seconds", "Time to apply one webhook event to the exclusion file", ("service",))
+
+
+def _within_budget(source: str, record, priorities: dict, tag_ids: set, size: int) -> bool:
+    """Whether a title fits in what the last budgeted build left; always true with the budget off"""
+    exclusions = get_user_settings().exclusions
+    if not exclusions.cache_budget_enabled:
+        return True
+    item = BudgetItem(f"{source}:{record.id}", source, record.title, tag_priority(record.tags, tag_ids, priorities))
+    item.size = size or 0
+    return get_cache_budget().admit(item)
+
+
+def _apply(source: str, roots, wanted, collapse=None) -> dict:
+    """Existence-check, collapse and map one title's paths, then replace its entries in the exclusion set"""
+    settings = get_user_settings()
+    mapper = PathMapper(settings.exclusions)
+    container_paths = {p: mapper.to_container(p) for p in wanted}
+    existing, _ = check_paths_exist(set(container_paths.values()), workers=settings.exclusions.existence_check_workers)
+    on_cache = [p for p in wanted if container_paths[p] in existing]
+    if collapse is not None:
+        on_cache = collapse(set(on_cache))
+    mapped = [m for _, _, m in mapper.rewrite_all((p, source) for p in on_cache)]
+    update = TitleUpdate(source, [mapper.rewrite(r, source) for r in roots if r], mapped)
+    return get_exclusion_set().apply(update)
+
+
+def handle_radarr_event(payload: dict) -> dict:
+    event = payload.get("eventType") or ""
+    movie = payload.get("movie") or {}
+    if event in IGNORED_EVENTS or not movie.get("id"):
+        WEBHOOK_EVENTS.inc(service="radarr", event=event, outcome="ignored")
+        return {"status": "ignored", "event": event}
+
+    try:
+        with WEBHOOK_SECONDS.time(service="radarr"):
+            settings = get_user_settings()
+            record = get_radarr_client().get_movie_record(movie["id"])
+            # The movie (or its tags) changed, so the Movies page must not keep serving the old snapshot
+            get_library_cache().invalidate("radarr")
+            wanted = []
+            tag_ids = set(settings.exclusions.radarr_exclude_tag_ids)
+            # Same rule as the build: the movie file once downloaded, else its folder
+            if (record is not None and not tag_ids.isdisjoint(record.tags)
+                    and _within_budget("radarr", record, settings.exclusions.radarr_tag_priorities, tag_ids, record.size_on_disk)):
+                path = record.file_path or record.path
+                if path:
+                    wanted.append(path)
+            # The payload's folder still names a deleted movie, and renamed files may have left an old folder
+            roots = {movie.get("folderPath"), record.path if record else None}
+            roots.update(os.path.dirname(f.get("previousPath") or "") for f in payload.get("renamedMovieFiles") or [])
+            result = _apply("radarr", roots, wanted)
+    except Exception as e:
+        WEBHOOK_EVENTS.inc(service="radarr", event=event, outcome="error")
+        logger.error(f"Radarr webhook {event} for movie {movie.get('id')} failed: {e}")
+        raise
+    WEBHOOK_EVENTS.inc(service="radarr", event=event, outcome="applied")
+    logger.info(f"Radarr webhook {event} for '{movie.get('title')}': +{result['added']} / -{result['removed']}")
+    return {"status": "applied", "event": event, **result}
+
+
+def handle_sonarr_event(payload: dict) -> dict:
+    event = payload.get("eventType") or ""
+    series = payload.get("series") or {}
+    if event in IGNORED_EVENTS or not series.get("id"):
+        WEBHOOK_EVENTS.inc(service="sonarr", event=event, outcome="ignored")
+        return {"status": "ignored", "event": event}
+
+    try:
+        with WEBHOOK_SECONDS.time(service="sonarr"):
+            settings = get_user_settings()
+            sonarr = get_sonarr_client()
+            record = sonarr.get_series_record(series["id"])
+            # The series (or its tags) changed, so the Shows page must not keep serving the old snapshot
+            get_library_cache().invalidate("sonarr")
+            wanted, collapse = [], None
+            tag_ids = set(settings.exclusions.sonarr_exclude_tag_ids)
+            if record is not None and not tag_ids.isdisjoint(record.tags):
+                files = sonarr.get_episode_file_records(record.id, settings.exclusions.sonarr_request_timeout)
+                # The client returns [] on errors; don't mistake a failed fetch for a series without files
+                if not files and record.episode_file_count:
+                    raise RuntimeError(f"episode files for series {record.id} could not be fetched")
+                if files and settings.exclusions.episode_cache_enabled:
+                    # Keeps the next full build from refetching this series
+                    episode_cache = get_episode_cache()
+                    episode_cache.put(record, files)
+                    episode_cache.save()
+                size = sum(ep.size for ep in files) if files else record.size_on_disk
+                if _within_budget("sonarr", record, settings.exclusions.sonarr_tag_priorities, tag_ids, size):
+                    wanted = [ep.path for ep in files if ep.path] or ([record.path] if record.path else [])
+                if wanted and files and settings.exclusions.sonarr_collapse_folders:
+                    # Same folder collapsing as the full build
+                    collapse = lambda on_cache: collapse_episode_files(
+                        record.path, files, on_cache, settings.exclusions.collapse_min_files)
+            result = _apply("sonarr", {series.get("path"), record.path if record else None}, wanted, collapse)
+    except Exception as e:
+        WEBHOOK_EVENTS.inc(service="sonarr", event=event, outcome="error")
+        logger.error(f"Sonarr webhook {event} for series {series.get('id')} failed: {e}")
+        raise
+    WEBHOOK_EVENTS.inc(service="sonarr", event=event, outcome="applied")
+    logger.info(f"Sonarr webhook {event} for '{series.get('title')}': +{result['added']} / -{result['removed']}")
+    return {"status": "applied", "event": event, **result}
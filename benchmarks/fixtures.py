@@ -0,0 +1,162 @@
+"""
+Deterministic synthetic library, cache tree and CA Mover logs for the benchmarks.
+
+Every title is derived from its index and the seed, so the stub servers, the
+cache tree and the mover logs agree on paths without sharing any state.
+"""
+import os
+import random
+import time
+from dataclasses import dataclass
+
+# Tag 1 marks titles to keep on cache; tag 2 is noise
+CACHE_TAG = 1
+OTHER_TAG = 2
+TAGS = [{"id": CACHE_TAG, "label": "cache"}, {"id": OTHER_TAG, "label": "4k"}]
+
+
+@dataclass
+class Scale:
+    movies: int = 1000
+    series: int = 100
+    episodes: int = 5000
+    # Fraction of titles carrying the cache tag
+    tagged: float = 0.2
+    # Fraction of tagged files that actually exist under the cache mount
+    on_cache: float = 0.8
+    seed: int = 1
+
+    @property
+    def episodes_per_series(self) -> int:
+        return max(1, self.episodes // max(1, self.series))
+
+
+PRESETS = {
+    "small": Scale(movies=1000, series=100, episodes=5000),
+    "medium": Scale(movies=10000, series=1000, episodes=60000),
+    "large": Scale(movies=50000, series=5000, episodes=500000),
+}
+
+
+def _rng(scale: Scale, kind: str, i: int) -> random.Random:
+    return random.Random(f"{scale.seed}:{kind}:{i}")
+
+
+def is_tagged(scale: Scale, kind: str, i: int) -> bool:
+    return _rng(scale, f"{kind}-tag", i).random() < scale.tagged
+
+
+def movie(scale: Scale, i: int) -> dict:
+    rng = _rng(scale, "movie", i)
+    year = 1950 + rng.randrange(75)
+    title = f"Movie {i:05d}"
+    folder = f"/data/media/movies/{title} ({year})"
+    item = {
+        "id": i,
+        "title": title,
+        "year": year,
+        "tags": [CACHE_TAG] if is_tagged(scale, "movie", i) else ([OTHER_TAG] if rng.random() < 0.1 else []),
+        "path": folder,
+        "hasFile": rng.random() < 0.9,
+        "sizeOnDisk": 0,
+        "monitored": True,
+    }
+    if item["hasFile"]:
+        size = rng.randrange(700, 60000) * 1024 * 1024
+        item["sizeOnDisk"] = size
+        item["movieFile"] = {"id": i, "path": f"{folder}/{title} ({year}).mkv", "size": size}
+    return item
+
+
+def series(scale: Scale, i: int) -> dict:
+    rng = _rng(scale, "series", i)
+    count = scale.episodes_per_series
+    return {
+        "id": i,
+        "title": f"Show {i:04d}",
+        "year": 1990 + rng.randrange(35),
+        "seasonCount": max(1, count // 10),
+        "tags": [CACHE_TAG] if is_tagged(scale, "series", i) else [],
+        "path": f"/data/media/tv/Show {i:04d}",
+        "lastAired": "2026-01-01T00:00:00Z",
+        "monitored": True,
+        "statistics": {"episodeFileCount": count, "sizeOnDisk": count * 1500 * 1024 * 1024},
+    }
+
+
+def episode_files(scale: Scale, series_id: int) -> list:
+    rng = _rng(scale, "episodes", series_id)
+    root = f"/data/media/tv/Show {series_id:04d}"
+    files = []
+    for k in range(scale.episodes_per_series):
+        season, episode = 1 + k // 10, 1 + k % 10
+        files.append({
+            "id": series_id * 100000 + k,
+            "seriesId": series_id,
+            "seasonNumber": season,
+            "path": f"{root}/Season {season}/Show {series_id:04d} - S{season:02d}E{episode:02d}.mkv",
+            "size": rng.randrange(200, 4000) * 1024 * 1024,
+        })
+    return files
+
+
+def build_cache_tree(scale: Scale, cache_root: str) -> int:
+    """Create empty files under cache_root for the tagged titles that are on cache; returns how many"""
+    created = 0
+    dirs = set()
+
+    def touch(api_path):
+        nonlocal created
+        path = os.path.join(cache_root, api_path.lstrip('/'))
+        parent = os.path.dirname(path)
+        if parent not in dirs:
+            os.makedirs(parent, exist_ok=True)
+            dirs.add(parent)
+        open(path, 'a').close()
+        created += 1
+
+    for i in range(1, scale.movies + 1):
+        if is_tagged(scale, "movie", i) and _rng(scale, "movie-cache", i).random() < scale.on_cache:
+            item = movie(scale, i)
+            if "movieFile" in item:
+                touch(item["movieFile"]["path"])
+    for i in range(1, scale.series + 1):
+        if is_tagged(scale, "series", i):
+            rng = _rng(scale, "series-cache", i)
+            for ep in episode_files(scale, i):
+                if rng.random() < scale.on_cache:
+                    touch(ep["path"])
+    return created
+
+
+def write_mover_logs(scale: Scale, log_dir: str, lists: int = 200, rows: int = 20000, idle_ratio: float = 0.8) -> int:
+    """Write Filtered_files_*.list files, one per hour going back from now; returns the bytes written.
+
+    Idle checks hold only a header. True runs list rows files, most moved,
+    the rest skipped (kept on cache).
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    rng = random.Random(f"{scale.seed}:logs")
+    written = 0
+    now = time.time()
+    movies = (movie(scale, i) for i in range(1, min(scale.movies, 2000) + 1))
+    paths = [f"/mnt/cache{m['movieFile']['path']}" for m in movies if "movieFile" in m]
+    for s in range(1, min(scale.series, 200) + 1):
+        paths.extend(f"/mnt/cache{ep['path']}" for ep in episode_files(scale, s))
+    for n in range(lists):
+        stamp = now - (lists - n) * 3600
+        name = time.strftime("%Y-%m-%dT%H%M%S", time.localtime(stamp))
+        list_path = os.path.join(log_dir, f"Filtered_files_{name}.list")
+        lines = ["Date | Pool | Share | Status | Path | Type | Size | Age | Hardlinks | Owner | Real path\n"]
+        if rng.random() >= idle_ratio:
+            for path in rng.sample(paths, min(rows, len(paths))):
+                status = "skipped" if rng.random() < 0.3 else "yes"
+                size = rng.randrange(200, 60000) * 1024 * 1024
+                lines.append(f"{name} | cache | data | {status} | {path} | f | {size} | 3 | 1 | nobody | {path}\n")
+        with open(list_path, 'w') as f:
+            f.writelines(lines)
+        with open(os.path.join(log_dir, f"Mover_tuning_{name}.log"), 'w') as f:
+            f.write(f"{name} mover run\n")
+        os.utime(list_path, (stamp, stamp))
+        written += os.path.getsize(list_path)
+    return written
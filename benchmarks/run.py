@@ -0,0 +1,259 @@
+"""
+Benchmark the exclusion builder, mover log parsing and the main routes against local stubs.
+
+    python -m benchmarks.run --preset medium --latency 20 --output results.json
+    python -m benchmarks.run --preset medium --latency 20 --baseline results.json
+
+Everything the app would read or write under /config is redirected to a
+scratch directory, so a run never touches real settings or output.
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks import fixtures
+from benchmarks.stub_arr import StubServer
+
+ROUTES = [
+    "/dashboard/",
+    "/movies/",
+    "/movies/api?limit=100",
+    "/movies/api?q=movie&sort=year&limit=100",
+    "/shows/",
+    "/shows/api?limit=100",
+    "/exclusions/",
+    "/exclusions/api?q=season&limit=200",
+    "/stats",
+    "/stats/api/protected?limit=200",
+    "/metrics",
+]
+
+
+class RssSampler:
+    """Peak resident set size while a case runs, sampled from /proc (Linux); elsewhere the process-lifetime peak"""
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self.running = False
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+
+    def _rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self.page_size
+        except OSError:
+            # ru_maxrss is KiB on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while self.running:
+            self.peak = max(self.peak, self._rss())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak, self.running = self._rss(), True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.running = False
+        self.thread.join()
+        self.peak = max(self.peak, self._rss())
+
+
+def measure(name, fn, stubs, repeat=1):
+    """Wall time (median over repeat, plus the first call), peak RSS and upstream requests of fn"""
+    before = {kind: stub.snapshot() for kind, stub in stubs.items()}
+    times = []
+    with RssSampler() as rss:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    requests = {}
+    for kind, stub in stubs.items():
+        after = stub.snapshot()
+        for endpoint, count in after.items():
+            delta = count - before[kind].get(endpoint, 0)
+            if delta:
+                requests[f"{kind} {endpoint}"] = delta
+    result = {
+        "name": name,
+        "wall_s": round(statistics.median(times), 4),
+        "first_s": round(times[0], 4),
+        "repeat": repeat,
+        "peak_rss_mb": round(rss.peak / 2**20, 1),
+        "requests": sum(requests.values()),
+        "requests_by_endpoint": requests,
+    }
+    print(f"{name:<48} {result['wall_s']:>9.4f}s  first {result['first_s']:>9.4f}s  "
+          f"peak {result['peak_rss_mb']:>8.1f} MB  {result['requests']:>7} req", flush=True)
+    return result
+
+
+def isolate(workdir, scale, radarr, sonarr, args):
+    """Point every /config-backed singleton at workdir and configure the app for the stubs"""
+    from app.core import config
+    from app.services import (cache_budget, episode_cache, exclusion_index, exclusion_set, exclusions, library_cache,
+                              mover_history, mover_index, stats_cache)
+
+    config._settings_store = config.SettingsStore(os.path.join(workdir, "settings.json"))
+    settings = config.UserSettings()
+    settings.radarr.url, settings.radarr.api_key = radarr.url, "benchmark"
+    settings.sonarr.url, settings.sonarr.api_key = sonarr.url, "benchmark"
+    settings.exclusions.radarr_exclude_tag_ids = [fixtures.CACHE_TAG]
+    settings.exclusions.sonarr_exclude_tag_ids = [fixtures.CACHE_TAG]
+    settings.exclusions.cache_mount_path = os.path.join(workdir, "cache")
+    settings.exclusions.host_cache_path = "/mnt/user"
+    settings.exclusions.plexcache_file_path = os.path.join(workdir, "plexcache.txt")
+    settings.exclusions.sonarr_fetch_workers = args.workers
+    settings.exclusions.sonarr_collapse_folders = args.collapse
+    config.save_user_settings(settings)
+
+    output = os.path.join(workdir, "mover_exclusions.txt")
+    manager = exclusions.ExclusionManager()
+    exclusions.get_exclusion_manager = lambda: manager
+    exclusion_set._exclusion_set = exclusion_set.ExclusionSet(output, os.path.join(workdir, "exclusion_set.json"))
+    exclusion_index._exclusion_index = exclusion_index.ExclusionIndex(output)
+    cache_budget._cache_budget = cache_budget.CacheBudget(os.path.join(workdir, "cache_budget.json"))
+    stats_cache._stats_cache = stats_cache.StatsCache(output, os.path.join(workdir, "exclusion_stats.json"))
+    episode_cache._episode_cache = episode_cache.EpisodeFileCache(os.path.join(workdir, "episode_cache.json"))
+    library_cache._library_cache = library_cache.LibraryCache()
+    mover_history._mover_history = mover_history.MoverHistory(os.path.join(workdir, "mover_history.db"))
+    mover_index._mover_index = mover_index.MoverLogIndex(os.path.join(workdir, "mover_logs"), os.path.join(workdir, "mover_index.json"))
+    return manager
+
+
+def run(args):
+    scale = fixtures.PRESETS[args.preset]
+    scale = fixtures.Scale(
+        movies=args.movies or scale.movies, series=args.series or scale.series,
+        episodes=args.episodes or scale.episodes, tagged=args.tagged, on_cache=args.on_cache, seed=args.seed,
+    )
+    workdir = args.workdir or tempfile.mkdtemp(prefix="mtem-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    print(f"Scale: {scale}; latency {args.latency} ms (+{args.jitter} ms jitter); workdir {workdir}", flush=True)
+
+    start = time.perf_counter()
+    files = fixtures.build_cache_tree(scale, os.path.join(workdir, "cache"))
+    log_bytes = fixtures.write_mover_logs(scale, os.path.join(workdir, "mover_logs"), args.lists, args.rows, args.idle_ratio)
+    radarr = StubServer("radarr", scale, args.latency / 1000, args.jitter / 1000).start()
+    sonarr = StubServer("sonarr", scale, args.latency / 1000, args.jitter / 1000).start()
+    stubs = {"radarr": radarr, "sonarr": sonarr}
+    print(f"Fixtures: {files} files on cache, {args.lists} mover lists ({log_bytes / 2**20:.1f} MB) "
+          f"in {time.perf_counter() - start:.1f}s", flush=True)
+
+    # app.main configures logging; keep the benchmark output readable
+    from app.main import app
+    logging.getLogger().setLevel(logging.WARNING)
+    from fastapi.testclient import TestClient
+    from app.services.build_jobs import BuildJob
+    from app.services.ca_mover import get_mover_parser
+
+    manager = isolate(workdir, scale, radarr, sonarr, args)
+    results = []
+    try:
+        if "build" in args.cases:
+            results.append(measure("build_exclusions (cold episode cache)", lambda: manager.build_exclusions(BuildJob("benchmark")), stubs))
+            results.append(measure("build_exclusions (warm episode cache)", lambda: manager.build_exclusions(BuildJob("benchmark")), stubs))
+        if "mover" in args.cases:
+            parser = get_mover_parser()
+            results.append(measure("MoverLogParser.refresh_index (cold)", parser.refresh_index, stubs))
+            results.append(measure("MoverLogParser.refresh_index (no changes)", parser.refresh_index, stubs, args.repeat))
+            results.append(measure("MoverLogParser.get_latest_stats", lambda: parser.get_latest_stats(include_files=False), stubs, args.repeat))
+            results.append(measure("MoverLogParser.get_latest_stats (with files)", parser.get_latest_stats, stubs, args.repeat))
+        if "webhook" in args.cases:
+            client = TestClient(app)
+            movie = fixtures.movie(scale, next(i for i in range(1, scale.movies + 1) if fixtures.is_tagged(scale, "movie", i)))
+            series = fixtures.series(scale, next(i for i in range(1, scale.series + 1) if fixtures.is_tagged(scale, "series", i)))
+            events = {
+                "radarr": {"eventType": "Download", "movie": {"id": movie["id"], "title": movie["title"], "folderPath": movie["path"]}},
+                "sonarr": {"eventType": "Download", "series": {"id": series["id"], "title": series["title"], "path": series["path"]}},
+            }
+            for service, event in events.items():
+                def post(service=service, event=event):
+                    response = client.post(f"/webhooks/{service}", json=event)
+                    if response.status_code >= 400:
+                        raise RuntimeError(f"POST /webhooks/{service} returned {response.status_code}")
+                results.append(measure(f"POST /webhooks/{service} (Download)", post, stubs, args.repeat))
+        if "routes" in args.cases:
+            # No lifespan, so the scheduler stays off and only the measured requests run
+            client = TestClient(app)
+            for route in ROUTES:
+                def get(route=route):
+                    response = client.get(route)
+                    if response.status_code >= 400:
+                        raise RuntimeError(f"GET {route} returned {response.status_code}")
+                results.append(measure(f"GET {route}", get, stubs, args.repeat))
+    finally:
+        radarr.stop()
+        sonarr.stop()
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "scale": scale.__dict__,
+        "latency_ms": args.latency,
+        "jitter_ms": args.jitter,
+        "python": sys.version.split()[0],
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        compare(report, args.baseline)
+
+
+def compare(report, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    print(f"\nChange vs {baseline_path}:")
+    for result in report["results"]:
+        old = baseline.get(result["name"])
+        if not old:
+            continue
+        wall = (result["wall_s"] - old["wall_s"]) / old["wall_s"] * 100 if old["wall_s"] else 0
+        rss = result["peak_rss_mb"] - old["peak_rss_mb"]
+        print(f"{result['name']:<48} wall {wall:>+7.1f}%  peak {rss:>+8.1f} MB  requests {result['requests'] - old['requests']:>+6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(fixtures.PRESETS), default="small")
+    parser.add_argument("--movies", type=int, help="override the preset's movie count")
+    parser.add_argument("--series", type=int, help="override the preset's series count")
+    parser.add_argument("--episodes", type=int, help="override the preset's total episode file count")
+    parser.add_argument("--tagged", type=float, default=0.2, help="fraction of titles tagged for cache")
+    parser.add_argument("--on-cache", type=float, default=0.8, help="fraction of tagged files present on the cache mount")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=5, help="stub latency per request, ms")
+    parser.add_argument("--jitter", type=float, default=0, help="extra random stub latency per request, up to this many ms")
+    parser.add_argument("--workers", type=int, default=4, help="sonarr_fetch_workers for the builder")
+    parser.add_argument("--collapse", action="store_true", help="write fully cached seasons/series as one folder entry")
+    parser.add_argument("--lists", type=int, default=200, help="Filtered_files lists to generate")
+    parser.add_argument("--rows", type=int, default=20000, help="rows per true mover run")
+    parser.add_argument("--idle-ratio", type=float, default=0.8, help="fraction of lists that are idle checks")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per warm case; the median is reported")
+    parser.add_argument("--cases", nargs="+", choices=["build", "mover", "webhook", "routes"],
+                        default=["build", "mover", "webhook", "routes"])
+    parser.add_argument("--workdir", help="scratch directory (kept); default is a temp dir removed afterwards")
+    parser.add_argument("--keep", action="store_true", help="keep the temp scratch directory")
+    parser.add_argument("--output", help="write results as JSON, e.g. to keep as a baseline")
+    parser.add_argument("--baseline", help="compare against an earlier --output file")
+    run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
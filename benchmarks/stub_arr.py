@@ -0,0 +1,113 @@
+"""
+Local HTTP stand-ins for the Radarr and Sonarr v3 endpoints the app uses
+"""
+import json
+import random
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import fixtures
+
+
+class StubServer:
+    """Serves one synthetic library on an ephemeral localhost port, counting requests per endpoint.
+
+    latency (seconds, plus up to jitter) is added to every request, so
+    slow upstreams can be simulated without a network.
+    """
+    def __init__(self, kind: str, scale: fixtures.Scale, latency: float = 0.0, jitter: float = 0.0):
+        self.kind = kind
+        self.scale = scale
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = Counter()
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        # Library and tag lists never change, so they are encoded once
+        if kind == "radarr":
+            library = [fixtures.movie(scale, i) for i in range(1, scale.movies + 1)]
+            self.static = {"/api/v3/movie": json.dumps(library).encode()}
+        else:
+            library = [fixtures.series(scale, i) for i in range(1, scale.series + 1)]
+            self.static = {"/api/v3/series": json.dumps(library).encode()}
+        self.static["/api/v3/tag"] = json.dumps(fixtures.TAGS).encode()
+        self.static["/api/v3/system/status"] = json.dumps({"appName": kind, "version": "stub"}).encode()
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name=f"stub-{kind}", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(self.requests)
+
+    def _body(self, path: str, query: dict):
+        if path in self.static:
+            return 200, self.static[path]
+        if self.kind == "sonarr" and path == "/api/v3/episodefile" and "seriesId" in query:
+            series_id = int(query["seriesId"][0])
+            if 1 <= series_id <= self.scale.series:
+                return 200, json.dumps(fixtures.episode_files(self.scale, series_id)).encode()
+            return 200, b"[]"
+        prefix = f"/api/v3/{'movie' if self.kind == 'radarr' else 'series'}/"
+        if path.startswith(prefix) and path[len(prefix):].isdigit():
+            i = int(path[len(prefix):])
+            if 1 <= i <= (self.scale.movies if self.kind == "radarr" else self.scale.series):
+                item = fixtures.movie(self.scale, i) if self.kind == "radarr" else fixtures.series(self.scale, i)
+                return 200, json.dumps(item).encode()
+        return 404, b'{"message": "NotFound"}'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _respond(self, status: int, body: bytes):
+                if server.latency or server.jitter:
+                    time.sleep(server.latency + random.random() * server.jitter)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server.lock:
+                    server.bytes_sent += len(body)
+
+            def _count(self, path: str):
+                # Ids are collapsed so each endpoint is one counter
+                parts = [p if not p.isdigit() else ":id" for p in path.split("/")]
+                with server.lock:
+                    server.requests[f"{self.command} {'/'.join(parts)}"] += 1
+
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                self._count(url.path)
+                self._respond(*server._body(url.path, urllib.parse.parse_qs(url.query)))
+
+            def do_PUT(self):
+                url = urllib.parse.urlsplit(self.path)
+                self._count(url.path)
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._respond(202, b"")
+
+        return Handler